@@ -1,60 +1,21 @@
-import requests
-import pandas as pd
 import matplotlib.pyplot as plt
-import time
 
-BASE_URL = "http://www.tng-project.org/api/TNG50-1"
-HEADERS = {"api-key": ""}
+import catalog_index
+import stage_store
 
-def get_group_m200(snapshot, grnr, max_retries=3):
-    snapshot = int(snapshot)
-    grnr = int(grnr)
-
-    url = f"{BASE_URL}/snapshots/{snapshot}/halos/{grnr}/info.json"
-
-    for attempt in range(max_retries):
-        try:
-            response = requests.get(url, headers=HEADERS)
-            if response.status_code != 200:
-                print(f"Erro HTTP {response.status_code} para grupo {grnr} no snapshot {snapshot}")
-                return None
-
-            data = response.json()
-            m200_crit = data.get("Group_M_Crit200")
-            if m200_crit is None:
-                print(f"Group_M_Crit200 não encontrado para grupo {grnr} no snapshot {snapshot}")
-                return None
-
-            return m200_crit  # Mantemos em 10¹⁰ M☉/h
-
-        except requests.exceptions.RequestException as e:
-            print(f"Erro na requisição para grupo {grnr} no snapshot {snapshot}: {e}")
-        except ValueError as e:
-            print(f"Erro ao decodificar JSON para grupo {grnr} no snapshot {snapshot}: {e}")
-            print(f"Resposta bruta: {response.text[:300]}")
-
-        print(f"Tentando novamente... ({attempt + 1}/{max_retries})")
-        time.sleep(2)
-
-    return None
+SIMULATION = "TNG50-1"
 
 def main(input_csv, output_csv):
-    df = pd.read_csv(input_csv, dtype={"snapshot": int, "subhalo_id": int, "group_number": int})
-    masses = []
+    df = stage_store.load(input_csv, stage="com_grupos")
 
     print(f"Processando {len(df)} linhas...")
 
-    for idx, row in df.iterrows():
-        snapshot = row["snapshot"]
-        grnr = row["group_number"]
-        m200 = get_group_m200(snapshot, grnr)
-        masses.append(m200)
-        print(f"Processados {idx+1}/{len(df)} grupos", end="\r")
-
-    df["M200c_10^10Msun/h"] = masses
+    # M200c (em 10¹⁰ M☉/h) vem do índice local do catálogo de grupos, sem uma requisição por linha
+    grupos = catalog_index.add_group_properties(df, SIMULATION, group_col="group_number")
+    df["M200c_10^10Msun/h"] = grupos["M200c_10^10Msun/h"]
     df_clean = df.dropna(subset=["M200c_10^10Msun/h"])
 
-    df_clean.to_csv(output_csv, index=False)
+    stage_store.save(df_clean, output_csv, "m200")
     print(f"\nArquivo CSV salvo: {output_csv}")
 
     plt.figure(figsize=(10,6))
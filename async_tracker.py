@@ -0,0 +1,194 @@
+"""Asyncio engine that tracks many galaxies concurrently.
+
+Each galaxy's progenitor chain is still sequential, but all chains in
+``GALAXIES`` run at once on one aiohttp session, so the total wall time
+is roughly that of the longest chain. A global semaphore caps the number
+of in-flight requests and a token bucket per host keeps the request rate
+within the TNG API quota. Responses go through the same on-disk caches as
+the synchronous client.
+"""
+import asyncio
+import json
+import os
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+from tqdm import tqdm
+
+import response_cache
+import snapshots
+import sublink
+import tng_api
+import tracker
+
+# --- Rate limiting ---
+REQUESTS_PER_SECOND = float(os.environ.get('TNG_RATE_LIMIT', 10))  # per host
+BURST = int(os.environ.get('TNG_RATE_BURST', 10))
+
+
+class AsyncTokenBucket:
+    """Token bucket refilled at ``rate`` tokens/s, holding at most ``capacity``."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AsyncTNGClient:
+    """aiohttp counterpart of ``tng_api`` with the same retry policy and caches."""
+
+    def __init__(self, max_in_flight=tng_api.MAX_CONCURRENT_REQUESTS,
+                 rate=REQUESTS_PER_SECOND, burst=BURST):
+        self.max_in_flight = max_in_flight
+        self.rate = rate
+        self.burst = burst
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._buckets = {}
+        self._session = None
+
+    async def __aenter__(self):
+        self._session = aiohttp.ClientSession(
+            headers={'api-key': tng_api.API_KEY},
+            connector=aiohttp.TCPConnector(limit=self.max_in_flight, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(sock_connect=tng_api.TIMEOUT, sock_read=tng_api.TIMEOUT),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+
+    def _bucket(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._buckets:
+            self._buckets[host] = AsyncTokenBucket(self.rate, self.burst)
+        return self._buckets[host]
+
+    async def _request(self, url, consume, params=None, headers=None):
+        """GET ``url`` and return ``await consume(response)``, retrying like ``tng_api``."""
+        if tng_api.OFFLINE:
+            raise tng_api.OfflineError(f"offline mode: {url} is not available locally")
+
+        for attempt in range(tng_api.MAX_RETRIES + 1):
+            delay = tng_api.BACKOFF_FACTOR * 2 ** attempt
+            await self._bucket(url).acquire()
+            try:
+                async with self._slots, self._session.get(url, params=params, headers=headers) as response:
+                    if response.status in tng_api.RETRY_STATUSES and attempt < tng_api.MAX_RETRIES:
+                        retry_after = response.headers.get('Retry-After', '')
+                        if retry_after.isdigit():
+                            delay = max(delay, int(retry_after))
+                    else:
+                        response.raise_for_status()
+                        return await consume(response)
+            except aiohttp.ClientConnectionError:
+                if attempt == tng_api.MAX_RETRIES:
+                    raise
+            await asyncio.sleep(delay)
+
+    async def get_json(self, url, params=None):
+        key = response_cache.cache_key(tng_api.API_ROOT, url, params) if tng_api.USE_CACHE else None
+        if key is not None:
+            body = response_cache.get_cache().get(key)
+            if body is not None:
+                return json.loads(body)
+
+        body = await self._request(url, lambda response: response.read(), params, tng_api.JSON_HEADERS)
+        data = json.loads(body)
+        if key is not None:
+            response_cache.get_cache().put(key, body)
+        return data
+
+    async def download(self, url, path, params=None, chunk_size=1 << 20):
+        """Stream ``url`` to ``path`` atomically, like ``tng_api.download``."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f'{path}.part'
+
+        async def write(response):
+            with open(tmp_path, 'wb') as f:
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    f.write(chunk)
+
+        await self._request(url, write, params)
+        os.replace(tmp_path, path)
+        return path
+
+
+async def walk_progenitors(client, subhalo_id, final_snap, sim=tng_api.DEFAULT_SIMULATION, min_snap=None):
+    """Async version of ``tracker.walk_progenitors``."""
+    rows = []
+    snap = final_snap
+    while snap != -1 and subhalo_id != -1 and (min_snap is None or snap >= min_snap):
+        url = f'{tng_api.base_url(sim)}/snapshots/{int(snap)}/subhalos/{int(subhalo_id)}/'
+        try:
+            data = await client.get_json(url)
+        except (aiohttp.ClientError, tng_api.OfflineError, ValueError) as e:
+            print(f"Request failed: {e}")
+            return tracker.Walk(rows[::-1], complete=False)
+        rows.append(tracker.progenitor_row(snap, subhalo_id, data, sim))
+
+        snap = data.get('prog_snap', -1)
+        subhalo_id = data.get('prog_sfid', -1)
+    return tracker.Walk(rows[::-1], complete=True)
+
+
+async def track_evolution(client, subhalo_id, final_snap, sim=tng_api.DEFAULT_SIMULATION, min_snap=None):
+    """Async version of ``tracker.track_evolution``: MPB first, walk as fallback."""
+    path = sublink.mpb_path(final_snap, subhalo_id, sim)
+    try:
+        if not os.path.exists(path):
+            url = f'{tng_api.base_url(sim)}/snapshots/{int(final_snap)}/subhalos/{int(subhalo_id)}/sublink/mpb.hdf5'
+            await client.download(url, path)
+        branch = sublink.load_branch(path, sim, min_snap)
+        return tracker.history_frame(subhalo_id, final_snap, branch=branch)
+    except (aiohttp.ClientError, tng_api.OfflineError, OSError, KeyError) as e:
+        print(f"Could not load MPB of subhalo {subhalo_id} (snapshot {final_snap}): {e}")
+
+    rows = await walk_progenitors(client, subhalo_id, final_snap, sim, min_snap)
+    return tracker.history_frame(subhalo_id, final_snap, rows=rows)
+
+
+async def track_galaxies_async(galaxies, sim=tng_api.DEFAULT_SIMULATION, min_snap=None, on_history=None,
+                                **client_options):
+    async with AsyncTNGClient(**client_options) as client:
+        tasks = [track_evolution(client, gal["id"], gal["final_snap"], sim, min_snap) for gal in galaxies]
+        progress = tqdm(total=len(tasks), desc="Tracking galaxies")
+
+        async def tracked(task):
+            history = await task
+            progress.update()
+            if on_history is not None:
+                on_history(history)
+            return history
+
+        try:
+            return await asyncio.gather(*(tracked(task) for task in tasks))
+        finally:
+            progress.close()
+
+
+def track_galaxies(galaxies, sim=tng_api.DEFAULT_SIMULATION, min_snap=None, on_history=None, **client_options):
+    """Evolution tables of all ``galaxies``, tracked concurrently (input order kept).
+
+    ``on_history`` is called with each galaxy's table as soon as it is done.
+    This runs its own event loop with ``asyncio.run``, so it cannot be called
+    from a running loop (e.g. a Jupyter cell); await ``track_galaxies_async``
+    there instead.
+    """
+    # Built synchronously up front so the event loop only does I/O
+    snapshots.get_snapshot_table(sim)
+    return asyncio.run(track_galaxies_async(galaxies, sim, min_snap, on_history, **client_options))
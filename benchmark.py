@@ -0,0 +1,294 @@
+"""End-to-end benchmarks against the mock TNG API and synthetic particle data.
+
+Stages (all numbers are written to one JSON file per run):
+
+- ``tracking``: requests/s of the progenitor walk (``tracker.walk_progenitors``
+  and, with aiohttp, the concurrent ``async_tracker`` walk)
+- ``cutouts``: bytes/s and peak memory of the ``tails.py`` cutout path
+  (subhalo document + field-selective download into the cutout store)
+- ``maps``: particles/s of ``get_surface_density_map`` at 1e5-1e7 particles,
+  plus the adaptive-kernel SPH maps at the smaller sizes
+- ``render``: frames/s of the ``tails.py`` render modes
+
+Each stage runs in its own subprocess against its own mock server, with
+the scripts' caches in a temporary directory, so every stage starts cold
+and never touches the real cache. The timed pass runs without
+tracemalloc and also gives the stage's peak RSS; a second, traced pass
+(skipped with ``--no-memory``) gives the peak of Python allocations.
+Compare two runs with ``--compare``::
+
+    python benchmark.py --output bench_new.json --compare bench_old.json
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+SIMULATION = 'TNG100-1'
+MAP_SIZES = (100_000, 1_000_000, 10_000_000)
+SPH_SIZES = (100_000, 1_000_000)
+RENDER_MODES = ('figure', 'template', 'fast')
+STAGES = ('tracking', 'cutouts', 'maps', 'render')
+# Imported before tracing starts, so the traced peak is the stage's work, not module imports
+STAGE_MODULES = {'tracking': ('tng_api', 'tracker'), 'cutouts': ('tails',),
+                 'maps': ('density_maps', 'tails'), 'render': ('tails',)}
+
+
+def peak_rss_mib():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+class Stage:
+    """Times a block and records mock-server traffic during it."""
+
+    def __init__(self, server=None):
+        self.server = server
+
+    def __enter__(self):
+        self.stats = dict(self.server.stats) if self.server else {}
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.start
+        if self.server:
+            self.requests = self.server.stats['requests'] - self.stats['requests']
+            self.bytes = self.server.stats['bytes'] - self.stats['bytes']
+
+
+# --- Stages ---
+
+def bench_tracking(server, galaxies, depth, client_rate=None):
+    import tng_api
+    import tracker
+    results = {}
+    ids = range(1000, 1000 + galaxies)
+    with Stage(server) as stage:
+        rows = sum(len(tracker.walk_progenitors(i, 99, SIMULATION, min_snap=99 - depth + 1)) for i in ids)
+    results['sync_walk'] = {'galaxies': galaxies, 'rows': rows, 'requests': stage.requests,
+                            'seconds': stage.seconds, 'requests_per_s': stage.requests / stage.seconds}
+
+    if tracker.HAVE_AIOHTTP:
+        import asyncio
+        import async_tracker
+        ids = range(2000, 2000 + galaxies)
+
+        rate = client_rate or async_tracker.REQUESTS_PER_SECOND
+
+        async def walk_all():
+            async with async_tracker.AsyncTNGClient(rate=rate, burst=max(async_tracker.BURST, int(rate))) as client:
+                walks = [async_tracker.walk_progenitors(client, i, 99, SIMULATION, min_snap=99 - depth + 1)
+                         for i in ids]
+                return await asyncio.gather(*walks)
+
+        with Stage(server) as stage:
+            rows = sum(len(walk) for walk in asyncio.run(walk_all()))
+        results['async_walk'] = {'galaxies': galaxies, 'rows': rows, 'requests': stage.requests,
+                                 'seconds': stage.seconds, 'requests_per_s': stage.requests / stage.seconds,
+                                 'max_in_flight': tng_api.MAX_CONCURRENT_REQUESTS, 'client_rate_limit': rate}
+    return results
+
+
+def bench_cutouts(server, count):
+    import tails
+    with Stage(server) as stage:
+        for subhalo_id in range(3000, 3000 + count):
+            details = tails.get_subhalo_details(99, subhalo_id)
+            tails.get_cutout_path(details, 99, subhalo_id)
+    return {'cutouts': count, 'requests': stage.requests, 'bytes': stage.bytes, 'seconds': stage.seconds,
+            'bytes_per_s': stage.bytes / stage.seconds, 'cutouts_per_s': count / stage.seconds}
+
+
+def synthetic_particles(n, plot_range, rng):
+    coords = rng.normal(50_000, plot_range / 4, (n, 3))
+    return coords, rng.exponential(1e-3, n)
+
+
+def bench_maps(sizes, sph_sizes, repeat):
+    import density_maps
+    import tails
+    rng = np.random.default_rng(0)
+    center = np.full(3, 50_000.0)
+    plot_range, pixels, box = tails.PLOT_SIZE_CKPC, tails.RESOLUTION_PIXELS, 75_000.0
+    results = {'histogram': {}, 'sph': {}}
+    for n in sizes:
+        coords, weights = synthetic_particles(n, plot_range, rng)
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            tails.get_surface_density_map(coords, weights, plot_range, pixels, center, box)
+            times.append(time.perf_counter() - start)
+        best = min(times)
+        results['histogram'][str(n)] = {'seconds': best, 'particles_per_s': n / best}
+    for n in sph_sizes:
+        coords, weights = synthetic_particles(n, plot_range, rng)
+        hsml = np.full(n, 2 * plot_range / pixels)  # two pixels
+        start = time.perf_counter()
+        density_maps.smoothed_surface_density_maps(coords, {'w': weights}, hsml, plot_range, pixels, center, box)
+        seconds = time.perf_counter() - start
+        results['sph'][str(n)] = {'seconds': seconds, 'particles_per_s': n / seconds}
+    return results
+
+
+def bench_render(frames, out_dir):
+    import tails
+    tails.init_render_worker()
+    rng = np.random.default_rng(1)
+    pixels = tails.RESOLUTION_PIXELS
+    sfr_map = rng.lognormal(-9, 3, (pixels, pixels))
+    y, x = np.mgrid[:pixels, :pixels] - pixels / 2
+    stellar_mass_map = np.exp(-(x ** 2 + y ** 2) / (2 * (pixels / 10) ** 2)) * 1e9
+    results = {}
+    for mode in RENDER_MODES:
+        start = time.perf_counter()
+        for i in range(frames):
+            job = {'snap': 99, 'subhalo_id': i, 'stellar_mass_log': 10.5, 'r_dist': 8.0,
+                   'output_filename': os.path.join(out_dir, f'{mode}_{i}.png')}
+            if mode == 'figure':
+                tails.plot_frame(job, 0.0, sfr_map, stellar_mass_map)
+            elif mode == 'template':
+                tails.get_frame_template().save(job, 0.0, sfr_map, stellar_mass_map)
+            else:
+                tails.save_fast_frame(job, sfr_map, stellar_mass_map)
+        seconds = time.perf_counter() - start
+        results[mode] = {'frames': frames, 'seconds': seconds, 'frames_per_s': frames / seconds}
+    return results
+
+
+# --- Stage processes ---
+
+def run_stage(stage, args, trace_memory=False):
+    """Results of one stage in this process, against a fresh mock server and cache."""
+    with tempfile.TemporaryDirectory(prefix='dark-jelly-bench-') as tmp_dir:
+        # The repo modules read these at import time, so they are set before importing them
+        import mock_tng_server
+        server = mock_tng_server.start_server(latency=args.latency, fixture_dir=os.path.join(tmp_dir, 'fixtures'))
+        os.environ['TNG_API_ROOT'] = server.root
+        os.environ['TNG_CACHE_DIR'] = os.path.join(tmp_dir, 'cache')
+
+        if trace_memory:
+            for module in STAGE_MODULES[stage]:
+                importlib.import_module(module)
+            tracemalloc.start()
+        if stage == 'tracking':
+            results = bench_tracking(server, galaxies=4 if args.quick else 20,
+                                     depth=10 if args.quick else 33, client_rate=args.client_rate)
+        elif stage == 'cutouts':
+            results = bench_cutouts(server, count=3 if args.quick else 20)
+        elif stage == 'maps':
+            results = bench_maps(MAP_SIZES[:2] if args.quick else MAP_SIZES,
+                                 SPH_SIZES[:1] if args.quick else SPH_SIZES, repeat=1 if args.quick else 3)
+        else:
+            os.makedirs(os.path.join(tmp_dir, 'frames'))
+            results = bench_render(3 if args.quick else 20, os.path.join(tmp_dir, 'frames'))
+        if trace_memory:
+            results = {'traced_peak_mib': tracemalloc.get_traced_memory()[1] / (1 << 20)}
+            tracemalloc.stop()
+        server.shutdown()
+    return results
+
+
+def run_stage_process(stage, args, trace_memory=False):
+    """``run_stage`` in a fresh interpreter, so peak RSS and imports belong to this stage alone."""
+    fd, path = tempfile.mkstemp(prefix=f'bench_{stage}_', suffix='.json')
+    os.close(fd)
+    cmd = [sys.executable, os.path.abspath(__file__), '--stages', stage, '--latency', str(args.latency),
+           '--child', 'memory' if trace_memory else 'time', '--output', path]
+    if args.quick:
+        cmd.append('--quick')
+    if args.client_rate:
+        cmd += ['--client-rate', str(args.client_rate)]
+    try:
+        subprocess.run(cmd, check=True)
+        with open(path) as f:
+            return json.load(f)
+    finally:
+        os.remove(path)
+
+
+# --- Comparison ---
+
+def flatten(results, prefix=''):
+    """``{'maps.histogram.100000.particles_per_s': value, ...}`` of the rate metrics."""
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{name}.'))
+        elif key.endswith('_per_s') or key.endswith('_mib'):
+            flat[name] = value
+    return flat
+
+
+def compare(new, old):
+    """Print new/old ratios of every shared metric (rates: >1 is faster; memory: >1 is larger)."""
+    new_flat, old_flat = flatten(new['results']), flatten(old['results'])
+    print(f"\n{'metric':60s} {'old':>12s} {'new':>12s} {'ratio':>7s}")
+    for name in sorted(new_flat.keys() & old_flat.keys()):
+        ratio = new_flat[name] / old_flat[name] if old_flat[name] else float('nan')
+        print(f'{name:60s} {old_flat[name]:12.4g} {new_flat[name]:12.4g} {ratio:7.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark tracking, cutouts, map binning and rendering.')
+    parser.add_argument('--stages', default='tracking,cutouts,maps,render')
+    parser.add_argument('--quick', action='store_true', help='small sizes, for a smoke run')
+    parser.add_argument('--latency', type=float, default=0.0, help='mock API latency per request (s)')
+    parser.add_argument('--client-rate', type=float, default=None,
+                        help='async client token-bucket rate (default TNG_RATE_LIMIT); raise it to measure the engine')
+    parser.add_argument('--output', default=None, help='JSON file (default bench_<timestamp>.json)')
+    parser.add_argument('--compare', default=None, help='earlier JSON result to compare against')
+    parser.add_argument('--no-memory', action='store_true', help='skip the traced-memory pass of each stage')
+    parser.add_argument('--child', choices=('time', 'memory'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    stages = [stage for stage in STAGES if stage in args.stages.split(',')]
+
+    if args.child:
+        # One stage of a parent run: raw results for the parent to collect
+        results = run_stage(stages[0], args, trace_memory=args.child == 'memory')
+        if args.child == 'time':
+            results['peak_rss_mib'] = peak_rss_mib()
+        with open(args.output, 'w') as f:
+            json.dump(results, f)
+        return
+
+    config = {'quick': args.quick, 'latency': args.latency, 'client_rate': args.client_rate,
+              'simulation': SIMULATION, 'memory_pass': not args.no_memory}
+    results = {}
+    for stage in stages:
+        results[stage] = run_stage_process(stage, args)
+        memory = {'peak_rss_mib': results[stage].pop('peak_rss_mib')}
+        if not args.no_memory:
+            memory.update(run_stage_process(stage, args, trace_memory=True))
+        results[stage]['memory'] = memory
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'platform': platform.platform(), 'python': platform.python_version(), 'numpy': np.__version__,
+        'cpu_count': os.cpu_count(), 'config': config, 'results': results,
+    }
+    output = args.output or f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f'\nSaved {output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
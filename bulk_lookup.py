@@ -0,0 +1,106 @@
+"""Parallel, rate-limited bulk lookups over (snapshot, subhalo_id) catalogs.
+
+Used by ``tng50.py`` / ``tng100.py`` to fetch one value per jellyfish row.
+A bounded thread pool does the requests, a token bucket replaces the old
+fixed ``sleep(0.2)``, and every result is appended to a checkpoint CSV as
+soon as it arrives, so an interrupted run resumes where it stopped.
+"""
+import csv
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import tng_api
+
+REQUESTS_PER_SECOND = float(os.environ.get('TNG_RATE_LIMIT', 10))
+BURST = int(os.environ.get('TNG_RATE_BURST', 10))
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at ``rate`` tokens/s, holding at most ``capacity``."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                time.sleep((1 - self._tokens) / self.rate)
+
+
+def read_checkpoint(path, key_columns):
+    """``{key: row}`` of lookups already stored in the checkpoint CSV."""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            done[tuple(int(row[col]) for col in key_columns)] = row
+    return done
+
+
+def run(keys, lookup, checkpoint_path, value_column, key_columns=('snapshot', 'subhalo_id'),
+        workers=tng_api.MAX_CONCURRENT_REQUESTS, rate=REQUESTS_PER_SECOND, burst=BURST, progress_every=50):
+    """Call ``lookup(*key)`` for every key not yet in ``checkpoint_path``.
+
+    Results that are not None are appended to the checkpoint as they
+    complete; failed keys are left out so a rerun retries them. Returns
+    ``{key: value}`` for every key with a result, including those loaded
+    from an earlier run.
+    """
+    keys = [tuple(int(k) for k in key) for key in keys]
+    done = read_checkpoint(checkpoint_path, key_columns)
+    results = {key: float(row[value_column]) for key, row in done.items()}
+    pending = iter(dict.fromkeys(key for key in keys if key not in results))
+    remaining = len(set(keys) - results.keys())
+    if results:
+        print(f"Retomando: {len(results)} já processadas, {remaining} restantes")
+
+    bucket = TokenBucket(rate, burst)
+
+    def limited(key):
+        bucket.acquire()
+        return lookup(*key)
+
+    new_file = not os.path.exists(checkpoint_path)
+    with open(checkpoint_path, 'a', newline='') as f, ThreadPoolExecutor(max_workers=workers) as pool:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow([*key_columns, value_column])
+
+        # Keep at most 2 * workers futures alive so huge catalogs stay bounded in memory
+        in_flight = {}
+        finished = 0
+        while True:
+            while len(in_flight) < 2 * workers:
+                key = next(pending, None)
+                if key is None:
+                    break
+                in_flight[pool.submit(limited, key)] = key
+            if not in_flight:
+                break
+
+            completed, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in completed:
+                key = in_flight.pop(future)
+                value = future.result()
+                if value is not None:
+                    results[key] = value
+                    writer.writerow([*key, value])
+                finished += 1
+                if finished % progress_every == 0 or finished == remaining:
+                    print(f"{finished}/{remaining} processadas")
+            f.flush()
+
+    return results
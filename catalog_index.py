@@ -0,0 +1,85 @@
+"""Local columnar index SubfindID -> GroupNumber -> (M200c, R200c, GroupPos).
+
+Built once per snapshot from the group catalog (see ``group_catalog``)
+and saved as ``.npz``. Whole DataFrames are joined against it with array
+indexing, one snapshot at a time, instead of one HTTP request per row.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+import group_catalog
+import response_cache
+
+INDEX_DIR = os.path.join(response_cache.CACHE_DIR, 'catalog_index')
+
+SUBHALO_FIELDS = ('SubhaloGrNr',)
+GROUP_FIELDS = ('Group_M_Crit200', 'Group_R_Crit200', 'GroupPos')
+
+# Output columns, in 10^10 M_sun/h and ckpc/h like the API
+GROUP_COLUMNS = {
+    'M200c_10^10Msun/h': 'Group_M_Crit200',
+    'R200c_ckpc/h': 'Group_R_Crit200',
+}
+POSITION_COLUMNS = ('GroupPos_x', 'GroupPos_y', 'GroupPos_z')
+
+
+def index_path(sim, snap):
+    return os.path.join(INDEX_DIR, sim, f'index_{int(snap):03d}.npz')
+
+
+def load_index(sim, snap):
+    """Arrays of the snapshot index, building and saving it on first use."""
+    path = index_path(sim, snap)
+    if not os.path.exists(path):
+        index = group_catalog.load_fields(sim, snap, SUBHALO_FIELDS, group='Subhalo')
+        index.update(group_catalog.load_fields(sim, snap, GROUP_FIELDS, group='Group'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez(path, **index)
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def _gather(values, ids, fill):
+    """``values[ids]`` with ``fill`` wherever an id is missing or out of range."""
+    ids = pd.to_numeric(pd.Series(ids), errors='coerce').to_numpy(dtype=float)
+    valid = np.isfinite(ids) & (ids >= 0) & (ids < len(values))
+    out = np.full((len(ids),) + values.shape[1:], fill, dtype=np.result_type(values, type(fill)))
+    out[valid] = values[ids[valid].astype(np.int64)]
+    return out
+
+
+def add_group_numbers(df, sim, snap_col='snapshot', subhalo_col='subhalo_id', out_col='GroupNumber'):
+    """Copy of ``df`` with the parent FoF group number of every subhalo (-1 if unknown)."""
+    df = df.copy()
+    group_numbers = np.full(len(df), -1, dtype=np.int64)
+    for snap, rows in df.groupby(snap_col).indices.items():
+        index = load_index(sim, snap)
+        group_numbers[rows] = _gather(index['SubhaloGrNr'], df[subhalo_col].to_numpy()[rows], -1)
+    df[out_col] = group_numbers
+    return df
+
+
+def add_group_properties(df, sim, snap_col='snapshot', group_col='GroupNumber'):
+    """Copy of ``df`` with M200c, R200c and group position of each row's group (NaN if unknown)."""
+    df = df.copy()
+    columns = {col: np.full(len(df), np.nan) for col in (*GROUP_COLUMNS, *POSITION_COLUMNS)}
+    for snap, rows in df.groupby(snap_col).indices.items():
+        index = load_index(sim, snap)
+        group_numbers = df[group_col].to_numpy()[rows]
+        for col, field in GROUP_COLUMNS.items():
+            columns[col][rows] = _gather(index[field], group_numbers, np.nan)
+        # An empty catalog stores GroupPos with shape (0,); keep it (n_groups, 3)
+        positions = _gather(index['GroupPos'].reshape(-1, len(POSITION_COLUMNS)), group_numbers, np.nan)
+        for axis, col in enumerate(POSITION_COLUMNS):
+            columns[col][rows] = positions[:, axis]
+    for col, values in columns.items():
+        df[col] = values
+    return df
+
+
+def join_environment(df, sim, snap_col='snapshot', subhalo_col='subhalo_id'):
+    """Group number plus group M200c, R200c and position for every subhalo row of ``df``."""
+    df = add_group_numbers(df, sim, snap_col, subhalo_col)
+    return add_group_properties(df, sim, snap_col, 'GroupNumber')
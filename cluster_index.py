@@ -0,0 +1,47 @@
+"""Vectorized classification of galaxies into reference-cluster M200c ranges.
+
+Each cluster is a ``(centre, error)`` range, as in the ``aglomerados``
+dicts of ``selecao_de_aglomerados.py`` and ``histom200.py``; a galaxy
+belongs to every cluster with ``centre - error <= M200c <= centre + error``.
+The masses are sorted once, and each cluster's range is located with
+``np.searchsorted`` (``twin_matching.window_matches``). This costs
+O((galaxies + clusters) log galaxies) instead of a Python loop over every
+cluster for every galaxy.
+"""
+import numpy as np
+import pandas as pd
+
+import twin_matching
+
+
+def membership(masses, aglomerados):
+    """Boolean DataFrame (galaxies x clusters, in dict order): True where a mass lies in a cluster's range."""
+    masses = pd.Series(masses)
+    names = list(aglomerados)
+    centros = np.array([aglomerados[nome][0] for nome in names], dtype=float)
+    erros = np.array([aglomerados[nome][1] for nome in names], dtype=float)
+    cluster, galaxy = twin_matching.window_matches(masses.to_numpy(dtype=float), centros, erros)
+    matrix = np.zeros((len(masses), len(names)), dtype=bool)
+    matrix[galaxy, cluster] = True
+    return pd.DataFrame(matrix, index=masses.index, columns=names)
+
+
+def labels(member, none_label="Nenhum", sep=", "):
+    """Names of all clusters of each galaxy joined by ``sep``; ``none_label`` if it is in none."""
+    if member.shape[1] == 0:
+        return pd.Series(none_label, index=member.index, dtype=object)
+    joined = member.dot(member.columns.to_series().add(sep)).str[:-len(sep)]
+    return joined.where(member.any(axis=1), none_label)
+
+
+def first_label(member, none_label="Fora dos intervalos"):
+    """Name of the first cluster (dict order) of each galaxy; ``none_label`` if it is in none."""
+    if member.shape[1] == 0:
+        return pd.Series(none_label, index=member.index, dtype=object)
+    return member.idxmax(axis=1).where(member.any(axis=1), none_label)
+
+
+def classify(masses, aglomerados, none_label="Nenhum", sep=", "):
+    """``(membership matrix, joined labels)`` of every mass in one pass."""
+    member = membership(masses, aglomerados)
+    return member, labels(member, none_label, sep)
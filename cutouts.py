@@ -0,0 +1,129 @@
+"""Streaming, field-selective particle cutouts and a local cutout store.
+
+Only the particle fields a script needs are requested from the cutout
+endpoint, the response is streamed to a file in chunks and the file is
+opened lazily with h5py, so datasets are read from disk on access instead
+of being held in memory as a full copy of the download.
+
+``CutoutStore`` keeps downloaded fields in compressed, chunked HDF5 files
+per (simulation, snapshot, subhalo) plus a JSON manifest of which
+particle fields each file holds, so reruns read cutouts locally and only
+fetch fields that are not stored yet.
+"""
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import h5py
+
+import response_cache
+import tng_api
+
+STORE_DIR = os.path.join(response_cache.CACHE_DIR, 'cutouts')
+
+# Particle type name used by the API -> HDF5 group in the cutout file
+PARTICLE_GROUPS = {'gas': 'PartType0', 'dm': 'PartType1', 'stars': 'PartType4', 'bhs': 'PartType5'}
+
+
+def cutout_params(fields):
+    """API query for ``{'gas': ('Coordinates', ...), ...}``."""
+    return {ptype: ','.join(names) for ptype, names in fields.items()}
+
+
+@contextmanager
+def open_cutout(cutout_url, fields):
+    """Download the requested ``fields`` of a cutout and yield the open HDF5 file.
+
+    The file lives in a temporary directory that is removed on exit, so
+    datasets must be read inside the ``with`` block.
+    """
+    with tempfile.TemporaryDirectory(prefix='cutout_') as tmp_dir:
+        path = tng_api.download(cutout_url, os.path.join(tmp_dir, 'cutout.hdf5'), params=cutout_params(fields))
+        with h5py.File(path, 'r') as f:
+            yield f
+
+
+def particle_group(f, ptype):
+    """HDF5 group of ``ptype`` in an open cutout, or an empty dict if absent."""
+    name = PARTICLE_GROUPS[ptype]
+    return f[name] if name in f else {}
+
+
+class CutoutStore:
+    """Persistent cutout files under ``root`` with a manifest of stored fields."""
+
+    def __init__(self, root=STORE_DIR, compression='gzip', compression_opts=4):
+        self.root = root
+        self.compression = compression
+        self.compression_opts = compression_opts
+        self.manifest_path = os.path.join(root, 'manifest.json')
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {}
+
+    @staticmethod
+    def key(sim, snap, subhalo_id):
+        return f'{sim}/{int(snap):03d}/{int(subhalo_id)}'
+
+    def path(self, sim, snap, subhalo_id):
+        return os.path.join(self.root, sim, f'snap_{int(snap):03d}', f'subhalo_{int(subhalo_id)}.hdf5')
+
+    def missing_fields(self, sim, snap, subhalo_id, fields):
+        """Subset of ``fields`` ({ptype: names}) not stored yet for this subhalo."""
+        stored = self.manifest.get(self.key(sim, snap, subhalo_id), {})
+        missing = {}
+        for ptype, names in fields.items():
+            absent = [name for name in names if name not in stored.get(ptype, [])]
+            if absent:
+                missing[ptype] = absent
+        return missing
+
+    def _save_manifest(self):
+        tmp_path = f'{self.manifest_path}.part'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _add(self, sim, snap, subhalo_id, cutout_url, fields):
+        path = self.path(sim, snap, subhalo_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open_cutout(cutout_url, fields) as src, h5py.File(path, 'a') as dst:
+            if 'Header' not in dst:
+                header = dst.create_group('Header')
+                header.attrs.update(dict(src['Header'].attrs))
+            for ptype, names in fields.items():
+                group = PARTICLE_GROUPS[ptype]
+                if group not in src:
+                    continue  # no particles of this type in the cutout
+                for name in names:
+                    data = src[group][name]
+                    out = dst.require_group(group)
+                    if name in out:
+                        del out[name]
+                    out.create_dataset(name, data=data[:], chunks=True, shuffle=True,
+                                       compression=self.compression, compression_opts=self.compression_opts)
+
+        with self._lock:
+            stored = self.manifest.setdefault(self.key(sim, snap, subhalo_id), {})
+            for ptype, names in fields.items():
+                stored[ptype] = sorted(set(stored.get(ptype, [])) | set(names))
+            self._save_manifest()
+
+    def fetch(self, sim, snap, subhalo_id, cutout_url, fields):
+        """Path of the stored cutout, first downloading any missing ``fields``."""
+        missing = self.missing_fields(sim, snap, subhalo_id, fields)
+        if missing:
+            self._add(sim, snap, subhalo_id, cutout_url, missing)
+        return self.path(sim, snap, subhalo_id)
+
+    @contextmanager
+    def open(self, sim, snap, subhalo_id, cutout_url, fields):
+        """Yield the stored cutout file, first downloading any missing ``fields``."""
+        with h5py.File(self.fetch(sim, snap, subhalo_id, cutout_url, fields), 'r') as f:
+            yield f
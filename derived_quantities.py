@@ -0,0 +1,61 @@
+"""Ratios and other derived quantities of the galaxy evolution tables.
+
+Tables are joined per galaxy on the snapshot number when both have one,
+and otherwise on the nearest redshift within ``REDSHIFT_TOLERANCE``
+(``pd.merge_asof``). An exact merge on float redshifts silently drops rows
+whose values were rounded differently. Ratios are computed column-wise
+with masked division, so a missing value or a zero denominator gives NaN
+instead of an error or inf.
+"""
+import numpy as np
+import pandas as pd
+
+# Snapshot redshifts of TNG differ by >= 0.009, so this never pairs two snapshots
+REDSHIFT_TOLERANCE = 1e-3
+GALAXY_KEYS = ('galaxy_id', 'final_snap')
+
+# Output column -> (numerator, denominator) in the tracker's table
+RATIOS = {
+    'gas_to_stars_ratio': ('mass_gas', 'mass_stars'),
+    'dm_to_stars_ratio': ('mass_dm', 'mass_stars'),
+}
+
+
+def masked_ratio(numerator, denominator):
+    """``numerator / denominator`` element-wise; NaN where either is missing or the denominator is 0."""
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    valid = np.isfinite(numerator) & np.isfinite(denominator) & (denominator != 0)
+    ratio = np.full(np.broadcast(numerator, denominator).shape, np.nan)
+    np.divide(numerator, denominator, out=ratio, where=valid)
+    return ratio
+
+
+def join_evolution(left, right, snap_col='snap', redshift_col='redshift',
+                   tolerance=REDSHIFT_TOLERANCE, suffixes=('', '_right')):
+    """Inner join of two evolution tables, per galaxy when both have ``GALAXY_KEYS``.
+
+    Rows are paired on ``snap_col`` when both tables have it, and otherwise
+    with the nearest ``redshift_col`` no further than ``tolerance`` away.
+    """
+    keys = [key for key in GALAXY_KEYS if key in left and key in right]
+    if snap_col in left and snap_col in right:
+        return left.merge(right, on=keys + [snap_col], how='inner', suffixes=suffixes)
+
+    # merge_asof keeps every left row; the marker drops the ones with no partner
+    right = right.assign(_matched=True)
+    merged = pd.merge_asof(left.sort_values(redshift_col), right.sort_values(redshift_col),
+                           on=redshift_col, by=keys or None, tolerance=tolerance,
+                           direction='nearest', suffixes=suffixes)
+    merged = merged[merged['_matched'].notna()].drop(columns='_matched')
+    return merged.sort_values(keys + [redshift_col], ascending=[True] * len(keys) + [False],
+                              ignore_index=True)
+
+
+def add_ratios(table, ratios=RATIOS):
+    """Copy of ``table`` with every ratio whose two columns it has."""
+    table = table.copy()
+    for name, (numerator, denominator) in ratios.items():
+        if numerator in table and denominator in table:
+            table[name] = masked_ratio(table[numerator], table[denominator])
+    return table
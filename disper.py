@@ -1,9 +1,10 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 
+import stage_store
+
 # Carregar o CSV
 csv_file = "gemeas_tng100_m200.csv"  # ou outro nome que esteja usando
-df = pd.read_csv(csv_file)
+df = stage_store.load(csv_file, ['M200c_10^10Msun/h', 'log10_stellar_mass'], 'm200')
 
 
 # Scatter plot
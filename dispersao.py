@@ -1,9 +1,10 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 
+import stage_store
+
 # Carregar o CSV
 csv_file = "gemeas_tng100_m200.csv"
-df = pd.read_csv(csv_file)
+df = stage_store.load(csv_file, ['subhalo_id', 'M200c_10^10Msun/h', 'log10_stellar_mass'], 'm200')
 
 # Scatter plot
 plt.figure(figsize=(12, 7))
@@ -0,0 +1,110 @@
+"""Direct array-to-PNG rendering of surface-density maps, without Matplotlib figures.
+
+For bulk survey frames only the map itself is needed: a log-normed
+colormap lookup, raster overlays for contour lines and a dashed circle,
+and a PNG written with ``zlib``. Everything is vectorized NumPy; the
+colormap is sampled from Matplotlib once and cached as a uint8 LUT.
+"""
+import struct
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+LUT_SIZE = 256
+PNG_COMPRESS_LEVEL = 1
+
+
+@lru_cache(maxsize=None)
+def colormap_lut(name='inferno', size=LUT_SIZE):
+    """``(size, 3)`` uint8 RGB table of a Matplotlib colormap."""
+    from matplotlib import colormaps
+    rgba = colormaps[name].resampled(size)(np.arange(size))
+    return np.round(rgba[:, :3] * 255).astype(np.uint8)
+
+
+def lognorm_index(data, vmin, vmax, size=LUT_SIZE):
+    """LUT index of every value under a ``LogNorm(vmin, vmax)``, binned like Matplotlib colormaps."""
+    scaled = np.log10(np.clip(data, vmin, vmax))
+    scaled -= np.log10(vmin)
+    scaled *= size / (np.log10(vmax) - np.log10(vmin))
+    index = scaled.astype(np.intp)
+    return np.minimum(index, size - 1, out=index)
+
+
+def contour_mask(field, levels):
+    """Pixels where ``field`` crosses any of ``levels`` (one-pixel-wide lines)."""
+    mask = np.zeros(field.shape, dtype=bool)
+    for level in levels:
+        above = field >= level
+        edge = np.zeros_like(mask)
+        edge[:, 1:] |= above[:, 1:] != above[:, :-1]
+        edge[1:, :] |= above[1:, :] != above[:-1, :]
+        mask |= edge
+    return mask
+
+
+def circle_mask(shape, radius, center=None, width=1.5, dash=None):
+    """Ring of ``width`` pixels at ``radius`` pixels around ``center``; dashed every ``dash`` pixels."""
+    ny, nx = shape
+    cy, cx = ((ny - 1) / 2, (nx - 1) / 2) if center is None else center
+    y, x = np.ogrid[:ny, :nx]
+    dy, dx = y - cy, x - cx
+    r = np.hypot(dx, dy)
+    mask = np.abs(r - radius) <= width / 2
+    if dash:
+        arc = (np.arctan2(dy, dx) + np.pi) * radius
+        mask &= (arc // dash) % 2 == 0
+    return mask
+
+
+def blend(rgb, mask, color, alpha=1.0):
+    """Paint ``color`` over ``rgb`` wherever ``mask`` is set, in place."""
+    color = np.asarray(color, dtype=float)
+    if alpha >= 1:
+        rgb[mask] = color.astype(np.uint8)
+    else:
+        rgb[mask] = np.round(rgb[mask] * (1 - alpha) + color * alpha).astype(np.uint8)
+    return rgb
+
+
+def encode_png(rgb, compress_level=PNG_COMPRESS_LEVEL):
+    """PNG bytes of an ``(height, width, 3)`` uint8 image (first row at the top)."""
+    height, width, _ = rgb.shape
+    # Filter byte 0 (None) in front of every scanline
+    raw = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    raw[:, 1:] = rgb.reshape(height, width * 3)
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', zlib.compress(raw.tobytes(), compress_level)) + chunk(b'IEND', b''))
+
+
+def render_map(data, vmin, vmax, cmap='inferno', contour_field=None, contour_levels=(),
+               contour_color=(0, 255, 255), contour_alpha=0.6,
+               circle_radius=None, circle_color=(64, 224, 208), circle_dash=6,
+               scale_bar=None, scale_bar_color=(255, 255, 255)):
+    """RGB image of a map stored with ``origin='lower'`` (row 0 at the bottom), flipped for output.
+
+    ``circle_radius`` is in pixels around the map centre; ``scale_bar`` is
+    ``(x0, x1, y)`` in pixels from the lower-left corner.
+    """
+    rgb = colormap_lut(cmap)[lognorm_index(data, vmin, vmax)]
+    if contour_field is not None and len(contour_levels):
+        blend(rgb, contour_mask(contour_field, contour_levels), contour_color, contour_alpha)
+    if circle_radius:
+        blend(rgb, circle_mask(data.shape, circle_radius, dash=circle_dash), circle_color)
+    if scale_bar is not None:
+        x0, x1, y = (int(round(v)) for v in scale_bar)
+        rgb[y:y + 2, x0:x1] = scale_bar_color
+    return rgb[::-1]
+
+
+def write_map_png(path, data, vmin, vmax, **options):
+    """Render a map with ``render_map`` and write it as PNG."""
+    with open(path, 'wb') as f:
+        f.write(encode_png(render_map(data, vmin, vmax, **options)))
+    return path
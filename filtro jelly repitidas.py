@@ -1,22 +1,10 @@
-import h5py
-import pandas as pd
+import jellyfish_catalog
 
-with h5py.File('jellyfish.hdf5', 'r') as f:
-    subfind_ids = f['Branches_SubfindID'][:].flatten()
-    snap_nums = f['Branches_SnapNum'][:].flatten()
-    scores = f['Branches_ScoreAdjusted'][:].flatten()
-    jelly_flags = f['Branches_JellyfishFlag'][:].flatten()
-
-df = pd.DataFrame({
-    'SubfindID': subfind_ids,
-    'SnapNum': snap_nums,
-    'ScoreAdjusted': scores,
-    'JellyfishFlag': jelly_flags
-})
-
-# Filtra apenas snapshots entre 68 e 99 e galáxias jellyfish (flag == 1)
-df = df[(df['SnapNum'] >= 67) & (df['SnapNum'] <= 99) & (df['JellyfishFlag'] == 1)]
-
-df.to_csv('jellyfish_local.csv', index=False)
-print(f"Arquivo 'jellyfish_local.csv' criado com {len(df)} entradas")
+# Filtra apenas snapshots entre 67 e 99 e galáxias jellyfish (flag == 1),
+# lendo o arquivo em blocos: só as linhas selecionadas ficam em memória
+n_rows = jellyfish_catalog.filter_to_csv(
+    'jellyfish.hdf5', 'jellyfish_local.csv',
+    where={'SnapNum': (67, 99), 'JellyfishFlag': (1, 1)},
+)
 
+print(f"Arquivo 'jellyfish_local.csv' criado com {n_rows} entradas")
@@ -1,89 +1,30 @@
-import requests
 import matplotlib.pyplot as plt
 import pandas as pd
 import os
 from tqdm import tqdm
 
+import journal
+import tracker
+from tracker import GALAXIES
+
 # --- API Configuration ---
-BASE_URL = 'https://www.tng-project.org/api/TNG100-1'
-API_TOKEN = ''
-
-HEADERS = {
-    'Accept': 'application/json',
-    'api-key': API_TOKEN
-}
-
-# --- Galaxy list ---
-GALAXIES = [
-    {"final_snap": 67, "id": 107813},
-    {"final_snap": 67, "id": 74123},
-    {"final_snap": 72, "id": 96419},
-    {"final_snap": 72, "id": 70711},
-    {"final_snap": 84, "id": 132263},
-    {"final_snap": 99, "id": 108037},
-    {"final_snap": 99, "id": 125033},
-    {"final_snap": 99, "id": 143888},
-    {"final_snap": 91, "id": 124318},
-    {"final_snap": 91, "id": 139737},
-    {"final_snap": 99, "id": 158854},
-    {"final_snap": 91, "id": 141670},
-    {"final_snap": 84, "id": 130203},
-    {"final_snap": 84, "id": 140404},
-    {"final_snap": 78, "id": 124397},
-    {"final_snap": 91, "id": 168847},
-    {"final_snap": 84, "id": 144300},
-    {"final_snap": 78, "id": 148900},
-    {"final_snap": 99, "id": 227576},
-    {"final_snap": 99, "id": 235696},
-    {"final_snap": 99, "id": 281704},
-    {"final_snap": 99, "id": 314772}
-]
+SIMULATION = 'TNG100-1'
+
 
 
 # --- Output directory ---
 OUTPUT_DIR = 'mass_gas_evolution'
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-# --- Helper functions ---
-def fetch_json(url):
-    try:
-        r = requests.get(url, headers=HEADERS)
-        r.raise_for_status()
-        return r.json()
-    except requests.RequestException as e:
-        print(f"Request failed: {e}")
-        return None
-
-def get_subhalo_data(snap, subhalo_id):
-    url = f'{BASE_URL}/snapshots/{snap}/subhalos/{subhalo_id}/'
-    return fetch_json(url)
-
-def get_snapshot_redshift(snap):
-    url = f'{BASE_URL}/snapshots/{snap}/'
-    data = fetch_json(url)
-    return data.get('redshift') if data else None
+# Galaxies already plotted by an interrupted run are skipped; cleared once a pass completes
+JOURNAL = journal.Journal(os.path.join(OUTPUT_DIR, 'journal.jsonl'))
 
+# --- Helper functions ---
 def track_gas_mass(subhalo_id, final_snap):
-    snap = final_snap
-    gas_mass, redshifts = [], []
-
-    while snap != -1 and subhalo_id != -1:
-        data = get_subhalo_data(snap, subhalo_id)
-        if data is None:
-            break
-
-        gas_mass.append(data.get('mass_gas'))
-        z = get_snapshot_redshift(snap)
-        if z is None:
-            break
-        redshifts.append(z)
-
-        snap = data.get('prog_snap', -1)
-        subhalo_id = data.get('prog_sfid', -1)
-
+    history = tracker.galaxy_history(subhalo_id, final_snap, SIMULATION)
     return {
-        "redshift": redshifts[::-1],
-        "mass_gas": gas_mass[::-1]
+        "redshift": history['redshift'].tolist(),
+        "mass_gas": history['mass_gas'].tolist()
     }
 
 def save_csv(data, subhalo_id, final_snap):
@@ -112,6 +53,8 @@ if __name__ == "__main__":
     for gal in tqdm(GALAXIES, desc="Processing galaxies"):
         snap = gal["final_snap"]
         subhalo_id = gal["id"]
+        if (subhalo_id, snap) in JOURNAL:
+            continue
 
         print(f"\n→ Processing galaxy {subhalo_id}_z{snap}")
         data = track_gas_mass(subhalo_id, snap)
@@ -125,3 +68,7 @@ if __name__ == "__main__":
 
         fig_path = plot_gas_mass(data, subhalo_id, snap)
         print(f"✓ Plot saved to {fig_path}")
+        JOURNAL.record(subhalo_id, snap)
+
+    # Pass complete: the next run plots everything again (e.g. after a style change)
+    JOURNAL.clear()
@@ -0,0 +1,77 @@
+"""Whole-snapshot group catalog fields as NumPy arrays.
+
+Fields such as ``Group_M_Crit200`` are read for every halo of a snapshot
+at once, either from local ``fof_subhalo_tab`` HDF5 chunks (set
+``TNG_GROUPCAT_PATH`` to the simulation ``output`` directory) or from a
+single field-subset download of the API ``groupcat`` file, which is then
+cached on disk. Index ``i`` of the returned arrays is group (or subhalo)
+number ``i``.
+"""
+import glob
+import os
+import re
+
+import h5py
+import numpy as np
+
+import response_cache
+import tng_api
+
+GROUPCAT_DIR = os.path.join(response_cache.CACHE_DIR, 'groupcat')
+GROUPCAT_BASEPATHS = {
+    sim: os.environ.get(f"TNG_GROUPCAT_PATH_{sim.replace('-', '_')}", os.environ.get('TNG_GROUPCAT_PATH'))
+    for sim in tng_api.SIMULATIONS
+}
+
+
+def local_chunks(basepath, snap):
+    """Paths of the ``fof_subhalo_tab`` chunks of ``snap``, in chunk order."""
+    pattern = os.path.join(basepath, f'groups_{snap:03d}', f'fof_subhalo_tab_{snap:03d}.*.hdf5')
+    chunk_number = re.compile(r'\.(\d+)\.hdf5$')
+    return sorted(glob.glob(pattern), key=lambda path: int(chunk_number.search(path).group(1)))
+
+
+def _read_chunks(paths, group, fields):
+    parts = {field: [] for field in fields}
+    for path in paths:
+        with h5py.File(path, 'r') as f:
+            source = f[group] if group in f else f
+            for field in fields:
+                # Chunks without any groups/subhalos have no datasets at all
+                if field in source:
+                    parts[field].append(source[field][:])
+    return {field: np.concatenate(chunks) if chunks else np.empty(0) for field, chunks in parts.items()}
+
+
+def download_fields(sim, snap, fields, group='Group'):
+    """Local path of an API groupcat file holding only ``fields``, downloading it once."""
+    name = f"groupcat_{snap:03d}_{group}_{'_'.join(sorted(fields))}.hdf5"
+    path = os.path.join(GROUPCAT_DIR, sim, name)
+    if not os.path.exists(path):
+        url = f'{tng_api.base_url(sim)}/files/groupcat-{snap}/'
+        tng_api.download(url, path, params={group: ','.join(fields)})
+    return path
+
+
+def load_fields(sim, snap, fields, group='Group', basepath=None):
+    """``{field: array}`` over all groups (``group='Group'``) or subhalos (``'Subhalo'``) of ``snap``."""
+    snap = int(snap)
+    fields = list(fields)
+    basepath = basepath or GROUPCAT_BASEPATHS.get(sim)
+    paths = local_chunks(basepath, snap) if basepath else []
+    if not paths:
+        paths = [download_fields(sim, snap, fields, group)]
+    return _read_chunks(paths, group, fields)
+
+
+def load_field(sim, snap, field, group='Group', basepath=None):
+    return load_fields(sim, snap, [field], group, basepath)[field]
+
+
+def top_k(values, k):
+    """Indices of the ``k`` largest values, largest first."""
+    k = min(k, len(values))
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(values, -k)[-k:]
+    return idx[np.argsort(values[idx])[::-1]]
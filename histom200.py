@@ -1,8 +1,10 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 
+import cluster_index
+import stage_store
+
 # Lê o CSV com as massas M200c
-df = pd.read_csv("gemeas_tng50_m200.csv")
+df = stage_store.load("gemeas_tng50_m200.csv", stage="m200")
 
 # Remove valores inválidos
 df_clean = df.dropna(subset=["M200c_10^10Msun/h"])
@@ -13,17 +15,12 @@ aglomerados = {
     "Subestrutura F0083": (3160, 670),                   # erro aproximado
 }
 
-# Classificação: qual galáxia cai em qual aglomerado
-def classificar_m200(m):
-    for nome, (centro, erro) in aglomerados.items():
-        if centro - erro <= m <= centro + erro:
-            return nome
-    return "Fora dos intervalos"
-
-df_clean["Aglomerado_Associado"] = df_clean["M200c_10^10Msun/h"].apply(classificar_m200)
+# Classificação: qual galáxia cai em qual aglomerado (o primeiro da lista, se houver mais de um)
+pertencimento = cluster_index.membership(df_clean["M200c_10^10Msun/h"], aglomerados)
+df_clean["Aglomerado_Associado"] = cluster_index.first_label(pertencimento, "Fora dos intervalos")
 
 # Salva o novo CSV com classificação
-df_clean.to_csv("gemeas_tng50_m200.csv", index=False)
+stage_store.save(df_clean, "gemeas_tng50_m200.csv", "m200")
 
 # Plot do histograma com faixas marcadas
 plt.figure(figsize=(10, 6))
@@ -0,0 +1,81 @@
+"""Block-wise, filtered reads of the ``jellyfish.hdf5`` branch table.
+
+The ``Branches_*`` datasets are read a block of rows at a time (a whole
+number of HDF5 chunks per block). Each block's predicate columns are read
+first; blocks with no matching rows are skipped without touching the other
+columns, and only the matching rows of a block are kept. Peak memory is set
+by the block size, not by the size of the table.
+"""
+import h5py
+import numpy as np
+import pandas as pd
+
+import stage_store
+
+# Output column -> dataset in jellyfish.hdf5
+DATASETS = {
+    'SubfindID': 'Branches_SubfindID',
+    'SnapNum': 'Branches_SnapNum',
+    'ScoreAdjusted': 'Branches_ScoreAdjusted',
+    'JellyfishFlag': 'Branches_JellyfishFlag',
+}
+BLOCK_BYTES = 16 << 20
+
+
+def block_rows(dataset, block_bytes=BLOCK_BYTES):
+    """Rows (along axis 0) per block: a whole number of chunks, about ``block_bytes`` in size."""
+    row_bytes = dataset.dtype.itemsize * int(np.prod(dataset.shape[1:], dtype=np.int64))
+    rows = max(1, block_bytes // max(row_bytes, 1))
+    if dataset.chunks:
+        chunk_rows = dataset.chunks[0]
+        rows = max(chunk_rows, rows // chunk_rows * chunk_rows)
+    return int(rows)
+
+
+def iter_filtered(f, columns=tuple(DATASETS), where=None, block_bytes=BLOCK_BYTES):
+    """Yield a DataFrame of the matching rows of every block of an open file.
+
+    ``where`` maps columns to inclusive ``(low, high)`` ranges, e.g.
+    ``{'SnapNum': (67, 99), 'JellyfishFlag': (1, 1)}``. Rows come out in
+    the order of the flattened datasets.
+    """
+    where = where or {}
+    first = f[DATASETS[columns[0]]]
+    n_rows = first.shape[0]
+    step = block_rows(first, block_bytes)
+
+    for start in range(0, n_rows, step):
+        block = slice(start, min(start + step, n_rows))
+        values = {}
+        mask = None
+        for col, (low, high) in where.items():
+            values[col] = f[DATASETS[col]][block].reshape(-1)
+            match = (values[col] >= low) & (values[col] <= high)
+            mask = match if mask is None else mask & match
+            if not mask.any():
+                break
+        if mask is not None and not mask.any():
+            continue
+
+        frame = {}
+        for col in columns:
+            data = values[col] if col in values else f[DATASETS[col]][block].reshape(-1)
+            frame[col] = data if mask is None else data[mask]
+        yield pd.DataFrame(frame)
+
+
+def read_filtered(path, columns=tuple(DATASETS), where=None, block_bytes=BLOCK_BYTES):
+    """All matching rows of ``path`` as one DataFrame."""
+    with h5py.File(path, 'r') as f:
+        blocks = list(iter_filtered(f, columns, where, block_bytes))
+    if blocks:
+        return pd.concat(blocks, ignore_index=True)
+    return pd.DataFrame({col: [] for col in columns})
+
+
+def filter_to_csv(path, csv_path, columns=tuple(DATASETS), where=None, block_bytes=BLOCK_BYTES):
+    """Stream the matching rows of ``path`` into the ``jellyfish_local`` stage files; returns the row count."""
+    with h5py.File(path, 'r') as f, stage_store.StageWriter(csv_path, columns, 'jellyfish_local') as out:
+        for frame in iter_filtered(f, columns, where, block_bytes):
+            out.write(frame)
+    return out.rows
@@ -0,0 +1,61 @@
+"""Append-only journals of completed work units, so interrupted batch runs resume.
+
+A unit is a small tuple such as ``(galaxy_id, final_snap)`` or
+``(galaxy_id, snap)``. Each completed unit is appended to the journal as
+one JSON line and flushed to disk at once; a rerun reads the journal back
+and skips every unit already in it. A line torn by a crash mid-write is
+ignored, so that unit is simply redone. Callers ``clear()`` the journal
+once a pass completes, so only an interrupted pass is resumed and the next
+full run redoes everything (e.g. with new plot settings).
+"""
+import json
+import os
+import threading
+
+
+def _normalize(unit):
+    # NumPy scalars -> Python ints/floats, so units compare equal to their JSON form
+    return tuple(value.item() if hasattr(value, 'item') else value for value in unit)
+
+
+class Journal:
+    """Set of completed units backed by a JSON-lines file at ``path``."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._done = set()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        self._done.add(tuple(json.loads(line)))
+                    except (ValueError, TypeError):
+                        continue  # torn last line of an interrupted run
+        elif os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def __contains__(self, unit):
+        return _normalize(unit) in self._done
+
+    def __len__(self):
+        return len(self._done)
+
+    def record(self, *unit):
+        """Mark ``unit`` as completed, durably."""
+        unit = _normalize(unit)
+        with self._lock:
+            if unit in self._done:
+                return
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(list(unit)) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self._done.add(unit)
+
+    def clear(self):
+        """Forget every unit and remove the file."""
+        with self._lock:
+            self._done.clear()
+            if os.path.exists(self.path):
+                os.remove(self.path)
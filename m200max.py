@@ -1,36 +1,34 @@
-import requests
+import numpy as np
 
-def find_max_m200c(sim_name, snapshot, max_attempts=50000):
-    headers = {'api-key': ''}
-    max_m200c = 0
-    max_grnr = None
+import group_catalog
 
-    for grnr in range(max_attempts):
-        halo_url = f"https://www.tng-project.org/api/{sim_name}/snapshots/{snapshot}/halos/{grnr}/info.json"
-        response = requests.get(halo_url, headers=headers)
+def find_max_m200c(sim_name, snapshot, top=5):
+    # Lê Group_M_Crit200 de todos os grupos do snapshot de uma vez (arquivos locais ou um único download)
+    m200c = group_catalog.load_field(sim_name, snapshot, 'Group_M_Crit200')
+    print(f"Simulação {sim_name} - Snapshot {snapshot}: {len(m200c)} grupos")
+    if len(m200c) == 0:
+        print("Nenhum grupo no catálogo.")
+        return None
 
-        if response.status_code == 404:
-            print(f"Parou no grupo {grnr} (não existe).")
-            break
-        elif response.status_code != 200:
-            print(f"Erro no grupo {grnr}: {response.status_code}")
-            continue
-
-        data = response.json()
-        m200c = data['Group_M_Crit200']
-        if m200c > max_m200c:
-            max_m200c = m200c
-            max_grnr = grnr
+    max_grnr = int(np.argmax(m200c))
+    max_m200c = float(m200c[max_grnr])
+    print(f"Maior M200c: {max_m200c:.2f} x10^10 Msol/h (grupo {max_grnr})")
 
-        if grnr % 1000 == 0:
-            print(f"Verificado até grupo {grnr}...")
+    print(f"Top {top} grupos:")
+    for grnr in group_catalog.top_k(m200c, top):
+        print(f"  grupo {grnr}: {m200c[grnr]:.2f} x10^10 Msol/h")
 
-    print(f"Simulação {sim_name} - Snapshot {snapshot}")
-    print(f"Maior M200c: {max_m200c:.2f} x10^10 Msol/h (grupo {max_grnr})")
+    positivos = m200c[m200c > 0]
+    if positivos.size:
+        p50, p90, p99 = np.percentile(positivos, [50, 90, 99])
+        print(f"Percentis (M200c > 0): p50 = {p50:.3g}, p90 = {p90:.3g}, p99 = {p99:.3g} x10^10 Msol/h")
+    else:
+        print("Nenhum grupo com M200c > 0: percentis não calculados.")
     return max_m200c
 
 snapshot_num = 99
 for sim in ['TNG50-1', 'TNG100-1']:
-    max_m = find_max_m200c(sim, snapshot_num, max_attempts=50000)
+    max_m = find_max_m200c(sim, snapshot_num)
+    if max_m is None:
+        continue
     print(f"Simulação {sim} - Snapshot {snapshot_num} - M200c máximo: {max_m:.2f} x10^10 Msol/h")
-
@@ -1,98 +1,32 @@
-import requests
 import matplotlib.pyplot as plt
 import pandas as pd
 import os
 from tqdm import tqdm
 
+import journal
+import tracker
+from tracker import GALAXIES
+
 # --- API Configuration ---
-BASE_URL = 'https://www.tng-project.org/api/TNG100-1'
-API_TOKEN = ''
-
-HEADERS = {
-    'Accept': 'application/json',
-    'api-key': API_TOKEN
-}
-
-# --- Galaxy list ---
-GALAXIES = [
-    {"final_snap": 67, "id": 107813},
-    {"final_snap": 67, "id": 74123},
-    {"final_snap": 72, "id": 96419},
-    {"final_snap": 72, "id": 70711},
-    {"final_snap": 84, "id": 132263},
-    {"final_snap": 99, "id": 108037},
-    {"final_snap": 99, "id": 125033},
-    {"final_snap": 99, "id": 143888},
-    {"final_snap": 91, "id": 124318},
-    {"final_snap": 91, "id": 139737},
-    {"final_snap": 99, "id": 158854},
-    {"final_snap": 91, "id": 141670},
-    {"final_snap": 84, "id": 130203},
-    {"final_snap": 84, "id": 140404},
-    {"final_snap": 78, "id": 124397},
-    {"final_snap": 91, "id": 168847},
-    {"final_snap": 84, "id": 144300},
-    {"final_snap": 78, "id": 148900},
-    {"final_snap": 99, "id": 227576},
-    {"final_snap": 99, "id": 235696},
-    {"final_snap": 99, "id": 281704},
-    {"final_snap": 99, "id": 314772}
-]
+SIMULATION = 'TNG100-1'
+
 
 OUTPUT_DIR = 'stellar_properties_evolution'
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-
-def fetch_json(url):
-    """Fetch JSON data with error handling."""
-    try:
-        r = requests.get(url, headers=HEADERS)
-        r.raise_for_status()
-        return r.json()
-    except requests.RequestException as e:
-        print(f"Request failed: {e}")
-        return None
-
-
-def get_subhalo_data(snap, subhalo_id):
-    return fetch_json(f'{BASE_URL}/snapshots/{snap}/subhalos/{subhalo_id}/')
-
-
-def get_snapshot_redshift(snap):
-    data = fetch_json(f'{BASE_URL}/snapshots/{snap}/')
-    return data.get('redshift') if data else None
+# Galaxies already plotted by an interrupted run are skipped; cleared once a pass completes
+JOURNAL = journal.Journal(os.path.join(OUTPUT_DIR, 'journal.jsonl'))
 
 
 def track_galaxy(subhalo_id, final_snap):
-    """Track galaxy backward in time through progenitors."""
-    snap = final_snap
-    stellar_mass, sfr, metallicity, half_mass_radius, redshifts = [], [], [], [], []
-
-    while snap != -1 and subhalo_id != -1:
-        data = get_subhalo_data(snap, subhalo_id)
-        if data is None:
-            break
-
-        stellar_mass.append(data.get('mass_stars'))
-        sfr.append(data.get('sfr'))
-        metallicity.append(data.get('starmetallicity'))
-        half_mass_radius.append(data.get('halfmassrad_stars'))
-
-        z = get_snapshot_redshift(snap)
-        if z is None:
-            break
-        redshifts.append(z)
-
-        snap = data.get('prog_snap', -1)
-        subhalo_id = data.get('prog_sfid', -1)
-
-    # Invert to chronological order
+    """Stellar properties of a galaxy from the shared evolution table (chronological)."""
+    history = tracker.galaxy_history(subhalo_id, final_snap, SIMULATION)
     return {
-        "redshift": redshifts[::-1],
-        "stellar_mass": stellar_mass[::-1],
-        "sfr": sfr[::-1],
-        "metallicity": metallicity[::-1],
-        "half_mass_radius": half_mass_radius[::-1]
+        "redshift": history['redshift'].tolist(),
+        "stellar_mass": history['mass_stars'].tolist(),
+        "sfr": history['sfr'].tolist(),
+        "metallicity": history['starmetallicity'].tolist(),
+        "half_mass_radius": history['halfmassrad_stars'].tolist()
     }
 
 
@@ -137,6 +71,8 @@ if __name__ == "__main__":
     for gal in tqdm(GALAXIES, desc="Processing galaxies"):
         subhalo_id = gal["id"]
         snap = gal["final_snap"]
+        if (subhalo_id, snap) in JOURNAL:
+            continue
 
         print(f"\n→ Galaxy {subhalo_id} (Snapshot {snap})")
 
@@ -150,3 +86,7 @@ if __name__ == "__main__":
 
         plot_file = plot_properties(data, subhalo_id, snap)
         print(f"✓ Saved plot: {plot_file}")
+        JOURNAL.record(subhalo_id, snap)
+
+    # Pass complete: the next run plots everything again (e.g. after a style change)
+    JOURNAL.clear()
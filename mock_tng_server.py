@@ -0,0 +1,550 @@
+"""Local stand-in for the IllustrisTNG web API, for offline benchmarks and checks.
+
+Serves the endpoints the scripts use, below ``/api/{simulation}/``:
+``snapshots/``, ``snapshots/{n}/``, ``snapshots/{n}/subhalos/{id}/``,
+``snapshots/{n}/halos/{id}/info.json``, field-selective subhalo cutouts
+(``.../cutout.hdf5?gas=...``), SubLink ``.../sublink/mpb.hdf5`` branches and
+``files/groupcat-{n}/?Group=...`` field subsets.
+
+A response is read from a recorded fixture under ``FIXTURE_DIR`` when one
+exists (``--record`` saves missing ones from the live API, needs
+``TNG_API_KEY``) and is otherwise synthesized from a deterministic toy
+catalog: every subhalo keeps its ID along its main progenitor branch and
+its properties grow smoothly with the scale factor, so the JSON walk and
+the MPB file give the same history. No fixtures ship with the repo (the
+live API needs a personal key), so by default, and in ``benchmark.py``,
+every response is synthetic. ``--check`` compares the synthetic JSON
+documents with whatever fixtures were recorded and lists missing keys or
+mismatched value types.
+
+Latency, random 5xx errors and 429 rate limiting are configurable. Point
+the scripts at the server with ``TNG_API_ROOT``; its responses are cached
+apart from the real API's (``response_cache.CACHE_DIR`` is per API root)::
+
+    python mock_tng_server.py --port 8765 --latency 0.05 --error-rate 0.01 --rate-limit 20
+    TNG_API_ROOT=http://127.0.0.1:8765/api python tails.py
+"""
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import h5py
+import numpy as np
+
+FIXTURE_DIR = os.environ.get('TNG_MOCK_FIXTURES', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                               'fixtures', 'tng_api'))
+UPSTREAM_ROOT = 'https://www.tng-project.org/api'
+
+HUBBLE_PARAM = 0.6774
+BOX_SIZES = {'TNG50-1': 35000.0, 'TNG100-1': 75000.0}  # ckpc/h
+N_SNAPSHOTS = 100
+N_SUBHALOS = 400_000
+SUBHALOS_PER_GROUP = 10
+GAS_PARTICLES = 20_000   # per cutout, before the per-subhalo scatter
+STAR_PARTICLES = 10_000
+
+# (snapshot, redshift) anchors of the TNG output list; other snapshots are interpolated
+REDSHIFT_ANCHORS = (
+    (0, 20.05), (2, 12.0), (4, 10.0), (6, 9.0), (8, 8.0), (11, 7.0), (13, 6.0), (17, 5.0),
+    (21, 4.0), (25, 3.0), (33, 2.0), (40, 1.5), (50, 1.0), (59, 0.7), (67, 0.5), (72, 0.4),
+    (78, 0.3), (84, 0.2), (91, 0.1), (99, 0.0),
+)
+
+
+def snapshot_redshifts():
+    snaps, z = zip(*REDSHIFT_ANCHORS)
+    return np.expm1(np.interp(np.arange(N_SNAPSHOTS), snaps, np.log1p(z)))
+
+
+REDSHIFTS = snapshot_redshifts()
+
+
+# --- Synthetic catalog ---
+
+def subhalo_seed(subhalo_id):
+    return np.random.default_rng([7, int(subhalo_id)]).uniform(size=8)
+
+
+def subhalo_properties(subhalo_id, snaps):
+    """Catalog values of ``subhalo_id`` at every snapshot in ``snaps`` (arrays)."""
+    u = subhalo_seed(subhalo_id)
+    a = 1 / (1 + REDSHIFTS[np.asarray(snaps)])
+    m0 = 10 ** (-1 + 2.5 * u[0])  # 10^10 M_sun/h at z=0
+    return {
+        'mass_stars': m0 * a ** 1.5,
+        'mass_gas': 0.6 * m0 * a ** (0.5 + u[1]),
+        'mass_dm': 25 * m0 * a,
+        'mass_bhs': 2e-3 * m0 * a ** 2,
+        'sfr': 2 * m0 * a ** 0.5 * (0.5 + u[2]),
+        'starmetallicity': 0.02 * a ** 0.3,
+        'halfmassrad_stars': (2 + 6 * u[3]) * a ** 0.5,
+    }
+
+
+def subhalo_position(sim, subhalo_id, snap):
+    u = subhalo_seed(subhalo_id)
+    box = BOX_SIZES.get(sim, 75000.0)
+    drift = 50 * (snap - 99) * (u[4:7] - 0.5)
+    return np.mod(u[4:7] * box + drift, box)
+
+
+def group_number(subhalo_id):
+    return int(subhalo_id) // SUBHALOS_PER_GROUP
+
+
+class Synthetic:
+    """Builds synthetic responses; ``root`` is the API root URL used in links."""
+
+    def __init__(self, root):
+        self.root = root.rstrip('/')
+
+    def snapshot(self, sim, snap):
+        return {'number': snap, 'redshift': float(REDSHIFTS[snap]),
+                'url': f'{self.root}/{sim}/snapshots/{snap}/',
+                'num_groups_subfind': N_SUBHALOS // SUBHALOS_PER_GROUP, 'num_subhalos': N_SUBHALOS}
+
+    def snapshots(self, sim):
+        return [self.snapshot(sim, snap) for snap in range(N_SNAPSHOTS)]
+
+    def simulation(self, sim):
+        return {'name': sim, 'boxsize': BOX_SIZES.get(sim), 'hubble': HUBBLE_PARAM,
+                'snapshots': f'{self.root}/{sim}/snapshots/'}
+
+    def subhalo(self, sim, snap, subhalo_id):
+        if not 0 <= subhalo_id < N_SUBHALOS:
+            return None
+        props = {key: float(values[0]) for key, values in subhalo_properties(subhalo_id, [snap]).items()}
+        pos = subhalo_position(sim, subhalo_id, snap)
+        url = f'{self.root}/{sim}/snapshots/{snap}/subhalos/{subhalo_id}/'
+        prog_snap, prog_id = (snap - 1, subhalo_id) if snap > 0 else (-1, -1)
+        desc_snap, desc_id = (snap + 1, subhalo_id) if snap < N_SNAPSHOTS - 1 else (-1, -1)
+        grnr = group_number(subhalo_id)
+        doc = {'id': subhalo_id, 'snap': snap, 'grnr': grnr,
+               'prog_snap': prog_snap, 'prog_sfid': prog_id, 'desc_snap': desc_snap, 'desc_sfid': desc_id,
+               'mass_log_msun': float(np.log10(props['mass_stars'] * 1e10 / HUBBLE_PARAM)),
+               'pos_x': pos[0], 'pos_y': pos[1], 'pos_z': pos[2],
+               'cm_x': pos[0], 'cm_y': pos[1], 'cm_z': pos[2], 'url': url}
+        doc.update(props)
+        doc['mass'] = props['mass_stars'] + props['mass_gas'] + props['mass_dm'] + props['mass_bhs']
+        halo_url = f'{self.root}/{sim}/snapshots/{snap}/halos/{grnr}/'
+        doc['related'] = {
+            'sublink_progenitor': f'{self.root}/{sim}/snapshots/{prog_snap}/subhalos/{prog_id}/' if prog_snap >= 0 else None,
+            'sublink_descendant': f'{self.root}/{sim}/snapshots/{desc_snap}/subhalos/{desc_id}/' if desc_snap >= 0 else None,
+            'parent_halo': halo_url,
+        }
+        doc['cutouts'] = {'subhalo': f'{url}cutout.hdf5', 'parent_halo': f'{halo_url}cutout.hdf5'}
+        doc['trees'] = {'sublink_mpb': f'{url}sublink/mpb.hdf5'}
+        return doc
+
+    def halo_info(self, sim, snap, grnr):
+        if not 0 <= grnr < N_SUBHALOS // SUBHALOS_PER_GROUP:
+            return None
+        group = group_catalog(sim, snap, [grnr])
+        return {field: values[0].tolist() for field, values in group.items()}
+
+    def cutout(self, sim, snap, subhalo_id, query):
+        """HDF5 bytes of a cutout holding the particle fields named in ``query``."""
+        u = subhalo_seed(subhalo_id)
+        rng = np.random.default_rng([11, snap, int(subhalo_id)])
+        center = subhalo_position(sim, subhalo_id, snap)
+        box = BOX_SIZES.get(sim, 75000.0)
+        radius = subhalo_properties(subhalo_id, [snap])['halfmassrad_stars'][0]
+        counts = {'gas': int(GAS_PARTICLES * (0.5 + u[1])), 'stars': int(STAR_PARTICLES * (0.5 + u[0]))}
+        requested = {ptype: [name for name in names.split(',') if name] for ptype, names in query.items()}
+
+        groups = {}
+        for ptype, group_name in (('gas', 'PartType0'), ('stars', 'PartType4')):
+            if ptype not in requested:
+                continue
+            n = counts[ptype]
+            scale = radius * (2.0 if ptype == 'gas' else 1.0)
+            offsets = rng.normal(0, scale, (n, 3))
+            if ptype == 'gas':
+                # A one-sided stripped tail, so jellyfish maps have something to show
+                tail = rng.uniform(size=n) < 0.3
+                offsets[tail, 0] += rng.exponential(4 * scale, tail.sum())
+            r = np.linalg.norm(offsets, axis=1) / scale
+            columns = {
+                'Coordinates': np.mod(center + offsets, box),
+                'Masses': rng.uniform(0.5, 1.5, n).astype(np.float32) * 1e-4,
+                'Density': (1e-3 * np.exp(-r)).astype(np.float32) + 1e-8,
+                'StarFormationRate': np.where(r < 1.5, rng.exponential(1e-3, n), 0).astype(np.float32),
+            }
+            groups[group_name] = {name: columns.get(name, rng.uniform(size=n).astype(np.float32))
+                                  for name in requested[ptype]}
+        header = {'BoxSize': box, 'HubbleParam': HUBBLE_PARAM,
+                  'Redshift': float(REDSHIFTS[snap]), 'Time': float(1 / (1 + REDSHIFTS[snap]))}
+        return hdf5_image(groups, {'Header': header})
+
+    def mpb(self, sim, snap, subhalo_id):
+        """HDF5 bytes of the SubLink main progenitor branch, root (``snap``) first."""
+        snaps = np.arange(snap, -1, -1)
+        props = subhalo_properties(subhalo_id, snaps)
+        mass_type = np.zeros((len(snaps), 6))
+        mass_type[:, 0] = props['mass_gas']
+        mass_type[:, 1] = props['mass_dm']
+        mass_type[:, 4] = props['mass_stars']
+        mass_type[:, 5] = props['mass_bhs']
+        radius_type = np.zeros((len(snaps), 6))
+        radius_type[:, 4] = props['halfmassrad_stars']
+        data = {
+            'SnapNum': snaps.astype(np.int16), 'SubfindID': np.full(len(snaps), subhalo_id, dtype=np.int64),
+            'SubhaloGrNr': np.full(len(snaps), group_number(subhalo_id), dtype=np.int32),
+            'SubhaloMassType': mass_type.astype(np.float32), 'SubhaloSFR': props['sfr'].astype(np.float32),
+            'SubhaloStarMetallicity': props['starmetallicity'].astype(np.float32),
+            'SubhaloHalfmassRadType': radius_type.astype(np.float32),
+            'SubhaloBHMass': props['mass_bhs'].astype(np.float32),
+        }
+        return hdf5_image({'': data})
+
+    def groupcat(self, sim, snap, query):
+        """HDF5 bytes of the groupcat fields in ``query`` (``{'Group': 'a,b', 'Subhalo': 'c'}``)."""
+        groups = {}
+        n_groups = N_SUBHALOS // SUBHALOS_PER_GROUP
+        for group, names in query.items():
+            names = [name for name in names.split(',') if name]
+            if group == 'Subhalo':
+                ids = np.arange(N_SUBHALOS)
+                fields = {'SubhaloGrNr': (ids // SUBHALOS_PER_GROUP).astype(np.int32)}
+                n = N_SUBHALOS
+            else:
+                fields = group_catalog(sim, snap, np.arange(n_groups))
+                n = n_groups
+            groups[group] = {name: fields.get(name, np.zeros(n, dtype=np.float32)) for name in names}
+        return hdf5_image(groups)
+
+
+def group_catalog(sim, snap, group_numbers):
+    """Synthetic group fields for an array of group numbers."""
+    group_numbers = np.asarray(group_numbers)
+    rng = np.random.default_rng([13, N_SUBHALOS])
+    log_m = rng.normal(1.0, 0.8, N_SUBHALOS // SUBHALOS_PER_GROUP)[group_numbers]
+    a = 1 / (1 + REDSHIFTS[snap])
+    m200 = (10 ** log_m * a).astype(np.float32)
+    box = BOX_SIZES.get(sim, 75000.0)
+    pos = rng.uniform(0, box, (N_SUBHALOS // SUBHALOS_PER_GROUP, 3))[group_numbers].astype(np.float32)
+    return {'Group_M_Crit200': m200, 'Group_R_Crit200': (160 * np.cbrt(m200)).astype(np.float32),
+            'GroupPos': pos, 'GroupFirstSub': (group_numbers * SUBHALOS_PER_GROUP).astype(np.int32)}
+
+
+def hdf5_image(groups, attrs=None):
+    """Bytes of an in-memory HDF5 file with ``{group: {name: array}}`` ('' = file root).
+
+    ``attrs`` maps group names to attributes, e.g. ``{'Header': {'BoxSize': ...}}``.
+    """
+    f = h5py.File(f'mock-{threading.get_ident()}-{time.monotonic_ns()}.hdf5', 'w',
+                  driver='core', backing_store=False)
+    try:
+        for group, values in (attrs or {}).items():
+            f.require_group(group).attrs.update(values)
+        for group, datasets in groups.items():
+            target = f.require_group(group) if group else f
+            for name, values in datasets.items():
+                target.create_dataset(name, data=values)
+        f.flush()
+        return f.id.get_file_image()
+    finally:
+        f.close()
+
+
+# --- Fixtures ---
+
+def fixture_path(path, query, fixture_dir=FIXTURE_DIR):
+    """File of the recorded response to ``path`` (below the API root) and ``query``."""
+    rel = path.lstrip('/')
+    if not rel or rel.endswith('/'):
+        rel += 'index.json'
+    if query:
+        rel += '@' + re.sub(r'[^\w.,=&-]', '_', urlencode(sorted(query.items())))
+    return os.path.join(fixture_dir, rel)
+
+
+def record_fixture(path, query, fixture_dir=FIXTURE_DIR):
+    """Fetch ``path`` from the live API and save it as a fixture; returns the body or None."""
+    import tng_api
+    url = f'{UPSTREAM_ROOT}/{path.lstrip("/")}'
+    try:
+        response = tng_api.get_session().get(url, params=query or None, timeout=tng_api.TIMEOUT)
+    except Exception:
+        return None
+    if response.status_code != 200:
+        return None
+    target = fixture_path(path, query, fixture_dir)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'wb') as f:
+        f.write(response.content)
+    return response.content
+
+
+# --- Routing ---
+
+ROUTES = (
+    ('simulation', re.compile(r'^(?P<sim>[\w-]+)/$')),
+    ('snapshots', re.compile(r'^(?P<sim>[\w-]+)/snapshots/$')),
+    ('snapshot', re.compile(r'^(?P<sim>[\w-]+)/snapshots/(?P<snap>\d+)/$')),
+    ('subhalo', re.compile(r'^(?P<sim>[\w-]+)/snapshots/(?P<snap>\d+)/subhalos/(?P<id>\d+)/$')),
+    ('cutout', re.compile(r'^(?P<sim>[\w-]+)/snapshots/(?P<snap>\d+)/(?:subhalos|halos)/(?P<id>\d+)/cutout\.hdf5$')),
+    ('mpb', re.compile(r'^(?P<sim>[\w-]+)/snapshots/(?P<snap>\d+)/subhalos/(?P<id>\d+)/sublink/mpb\.hdf5$')),
+    ('halo_info', re.compile(r'^(?P<sim>[\w-]+)/snapshots/(?P<snap>\d+)/halos/(?P<id>\d+)/info\.json$')),
+    ('groupcat', re.compile(r'^(?P<sim>[\w-]+)/files/groupcat-(?P<snap>\d+)/?$')),
+)
+
+
+def synthesize(synthetic, path, query):
+    """Synthetic response to ``path`` (below the API root): a JSON document, HDF5 bytes or None."""
+    for name, pattern in ROUTES:
+        match = pattern.match(path)
+        if match is None:
+            continue
+        args = match.groupdict()
+        sim = args['sim']
+        if 'snap' in args and not 0 <= int(args['snap']) < N_SNAPSHOTS:
+            return None
+        if name == 'simulation':
+            return synthetic.simulation(sim)
+        if name == 'snapshots':
+            return synthetic.snapshots(sim)
+        if name == 'snapshot':
+            return synthetic.snapshot(sim, int(args['snap']))
+        if name == 'subhalo':
+            return synthetic.subhalo(sim, int(args['snap']), int(args['id']))
+        if name == 'cutout':
+            return synthetic.cutout(sim, int(args['snap']), int(args['id']), query)
+        if name == 'mpb':
+            return synthetic.mpb(sim, int(args['snap']), int(args['id']))
+        if name == 'halo_info':
+            return synthetic.halo_info(sim, int(args['snap']), int(args['id']))
+        if name == 'groupcat':
+            return synthetic.groupcat(sim, int(args['snap']), query)
+    return None
+
+
+# --- Shape check of the synthetic documents ---
+
+def json_shape(value):
+    """Outline of a JSON document: its keys and value kinds, with lists reduced to their first item."""
+    if isinstance(value, dict):
+        return {key: json_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [json_shape(value[0])] if value else []
+    if value is None or isinstance(value, (bool, str)):
+        return type(value).__name__
+    return 'number'
+
+
+def shape_differences(recorded, synthetic, where=''):
+    """Where the synthetic document's shape departs from a recorded one (None values match anything)."""
+    if 'NoneType' in (recorded, synthetic):
+        return []
+    if isinstance(recorded, dict) and isinstance(synthetic, dict):
+        differences = [f'{where}{key}: missing' for key in recorded if key not in synthetic]
+        differences += [f'{where}{key}: not in the real API' for key in synthetic if key not in recorded]
+        for key in recorded.keys() & synthetic.keys():
+            differences += shape_differences(recorded[key], synthetic[key], f'{where}{key}.')
+        return differences
+    if isinstance(recorded, list) and isinstance(synthetic, list):
+        if recorded and synthetic:
+            return shape_differences(recorded[0], synthetic[0], f'{where}[0].')
+        return []
+    if type(recorded) is not type(synthetic) or recorded != synthetic:
+        return [f'{where.rstrip(".")}: {recorded} in the real API, {synthetic} here']
+    return []
+
+
+def check_fixtures(fixture_dir=FIXTURE_DIR):
+    """Compare every recorded JSON fixture with the synthetic response to the same path.
+
+    Returns ``{fixture: [differences]}`` for the fixtures whose shape differs.
+    """
+    synthetic = Synthetic(UPSTREAM_ROOT)
+    report = {}
+    for folder, _, files in os.walk(fixture_dir):
+        for name in files:
+            if '@' in name or not name.endswith('.json'):
+                continue  # HDF5 responses (cutouts, MPB, groupcat subsets)
+            target = os.path.join(folder, name)
+            path = os.path.relpath(target, fixture_dir).replace(os.sep, '/')
+            path = path[:-len('index.json')] if name == 'index.json' else path
+            with open(target) as f:
+                recorded = json.load(f)
+            response = synthesize(synthetic, path, {})
+            if not isinstance(response, (dict, list)):
+                report[path] = ['no synthetic JSON response']
+                continue
+            differences = shape_differences(json_shape(recorded), json_shape(response))
+            if differences:
+                report[path] = differences
+    return report
+
+
+# --- Server ---
+
+class TokenBucket:
+    """Requests/s budget shared by all handler threads; ``take`` is non-blocking."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        """True if a token was available, otherwise the seconds until the next one."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return (1 - self._tokens) / self.rate
+
+
+class MockTNGServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit=None, burst=None,
+                 fixture_dir=FIXTURE_DIR, record=False, verbose=False):
+        super().__init__(address, MockTNGHandler)
+        self.root = f'http://{self.server_address[0]}:{self.server_address[1]}/api'
+        self.synthetic = Synthetic(self.root)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.bucket = TokenBucket(rate_limit, burst or max(1, int(rate_limit))) if rate_limit else None
+        self.fixture_dir = fixture_dir
+        self.record = record
+        self.verbose = verbose
+        self.stats = {'requests': 0, 'rate_limited': 0, 'errors': 0, 'bytes': 0}
+        self.stats_lock = threading.Lock()
+
+    def count(self, key, n=1):
+        with self.stats_lock:
+            self.stats[key] += n
+
+
+class MockTNGHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_body(self, status, body, content_type, headers=()):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in headers:
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count('bytes', len(body))
+
+    def send_json(self, status, data, headers=()):
+        self.send_body(status, json.dumps(data).encode(), 'application/json', headers)
+
+    def do_GET(self):
+        server = self.server
+        server.count('requests')
+
+        if server.bucket is not None:
+            wait = server.bucket.take()
+            if wait is not True:
+                server.count('rate_limited')
+                return self.send_json(429, {'detail': 'Request was throttled.'},
+                                      [('Retry-After', f'{max(1, round(wait))}')])
+        if server.latency or server.jitter:
+            time.sleep(server.latency + random.uniform(0, server.jitter))
+        if server.error_rate and random.random() < server.error_rate:
+            server.count('errors')
+            return self.send_json(503, {'detail': 'Injected error.'})
+
+        parts = urlsplit(self.path)
+        if not parts.path.startswith('/api/'):
+            return self.send_json(404, {'detail': 'Not found.'})
+        path = parts.path[len('/api/'):]
+        query = dict(parse_qsl(parts.query))
+
+        body = self.fixture(path, query)
+        if body is not None:
+            # Cutouts, MPB files and groupcat subsets are HDF5; everything else is JSON
+            if path.endswith('.hdf5') or query:
+                return self.send_body(200, body, 'application/x-hdf5')
+            # Recorded links point at the live API; serve them pointing here
+            return self.send_body(200, body.replace(UPSTREAM_ROOT.encode(), server.root.encode()), 'application/json')
+
+        try:
+            response = synthesize(server.synthetic, path, query)
+        except (IndexError, ValueError) as e:
+            return self.send_json(400, {'detail': str(e)})
+        if response is None:
+            return self.send_json(404, {'detail': 'Not found.'})
+        if isinstance(response, bytes):
+            return self.send_body(200, response, 'application/x-hdf5')
+        return self.send_json(200, response)
+
+    def fixture(self, path, query):
+        server = self.server
+        target = fixture_path(path, query, server.fixture_dir)
+        if os.path.exists(target):
+            with open(target, 'rb') as f:
+                return f.read()
+        if server.record:
+            return record_fixture(path, query, server.fixture_dir)
+        return None
+
+
+def start_server(host='127.0.0.1', port=0, **options):
+    """Run a server in a daemon thread; returns it (``server.root`` is the API root URL)."""
+    server = MockTNGServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='extra random latency, up to this many seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    parser.add_argument('--rate-limit', type=float, default=None, help='requests/s before answering 429')
+    parser.add_argument('--burst', type=int, default=None, help='requests allowed at once under --rate-limit')
+    parser.add_argument('--fixtures', default=FIXTURE_DIR, help='directory of recorded responses')
+    parser.add_argument('--record', action='store_true', help='save responses missing from --fixtures from the live API')
+    parser.add_argument('--verbose', action='store_true')
+    parser.add_argument('--check', action='store_true',
+                        help='compare the synthetic JSON documents with the recorded fixtures and exit')
+    args = parser.parse_args()
+
+    if args.check:
+        report = check_fixtures(args.fixtures)
+        for path, differences in sorted(report.items()):
+            print(path)
+            for difference in differences:
+                print(f'  {difference}')
+        print(f'{len(report)} recorded documents differ in shape from the synthetic ones')
+        raise SystemExit(1 if report else 0)
+
+    server = MockTNGServer((args.host, args.port), latency=args.latency, jitter=args.jitter,
+                           error_rate=args.error_rate, rate_limit=args.rate_limit, burst=args.burst,
+                           fixture_dir=args.fixtures, record=args.record, verbose=args.verbose)
+    print(f'Mock TNG API at {server.root}  (export TNG_API_ROOT={server.root})')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f'Stats: {server.stats}')
+
+
+if __name__ == '__main__':
+    main()
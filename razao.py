@@ -1,43 +1,50 @@
+import os
+
 import pandas as pd
 import matplotlib.pyplot as plt
 
-# Carregar CSVs
-df_stars = pd.read_csv('galaxy_evolution.csv')
-df_gas = pd.read_csv('gas_mass_evolution.csv')
+import derived_quantities
+import tracker
 
-# Verificar colunas dos arquivos
-print('Colunas em galaxy_evolution.csv:', df_stars.columns)
-print('Colunas em gas_mass_evolution.csv:', df_gas.columns)
+# Fonte dos dados: a tabela de evolução do tracker, com todas as galáxias de tracker.GALAXIES.
+# Para usar CSVs separados (ex.: galaxy_evolution.csv com mass_stars e gas_mass_evolution.csv
+# com mass_gas), coloque os dois arquivos aqui; eles são unidos por snapshot, ou pelo redshift
+# mais próximo dentro de derived_quantities.REDSHIFT_TOLERANCE se não tiverem a coluna 'snap'
+ARQUIVOS_SEPARADOS = None  # ('galaxy_evolution.csv', 'gas_mass_evolution.csv')
 
-# Supondo que colunas relevantes sejam: 'redshift' e 'mass_stars' em df_stars
-# e 'redshift' e 'mass_gas' em df_gas
-# Faça merge pelos valores próximos de redshift
-df_merged = pd.merge(df_stars, df_gas, on='redshift', how='inner')
+if ARQUIVOS_SEPARADOS:
+    df_stars, df_gas = (pd.read_csv(path) for path in ARQUIVOS_SEPARADOS)
+    df_merged = derived_quantities.join_evolution(df_stars, df_gas)
+    print(f'{len(df_merged)} de {len(df_stars)} linhas de {ARQUIVOS_SEPARADOS[0]} pareadas')
+else:
+    df_merged = tracker.load_evolution_table()
 
-# Calcular a razão massa_gas / massa_stars com cuidado para evitar divisão por zero
-def safe_ratio(row):
-    ms = row.get('mass_stars', None)
-    mg = row.get('mass_gas', None)
-    if pd.isna(ms) or ms == 0 or pd.isna(mg):
-        return None
-    return mg / ms
+# Razões gás/estrelas e DM/estrelas (NaN onde a massa estelar é zero ou falta)
+df_merged = derived_quantities.add_ratios(df_merged)
+os.makedirs(tracker.OUTPUT_DIR, exist_ok=True)
+df_merged.to_csv(os.path.join(tracker.OUTPUT_DIR, 'mass_ratios.csv'), index=False)
 
-df_merged['gas_to_stars_ratio'] = df_merged.apply(safe_ratio, axis=1)
+keys = [key for key in derived_quantities.GALAXY_KEYS if key in df_merged]
+galaxias = df_merged.groupby(keys, sort=False) if keys else [('', df_merged)]
 
 # Plotar
 fig, axs = plt.subplots(3, 1, figsize=(10, 14), sharex=True)
 
-axs[0].plot(df_merged['redshift'], df_merged['mass_stars'], marker='o', color='blue')
-axs[0].set_ylabel('Massa Estelar\n[$10^{10} M_\\odot / h$]')
+for key, df_gal in galaxias:
+    df_gal = df_gal.sort_values('redshift')
+    label = f'ID {key[0]} (snap {key[1]})' if len(keys) == 2 else None
+    axs[0].plot(df_gal['redshift'], df_gal['mass_stars'], marker='o', markersize=3, label=label)
+    axs[1].plot(df_gal['redshift'], df_gal['mass_gas'], marker='o', markersize=3)
+    axs[2].plot(df_gal['redshift'], df_gal['gas_to_stars_ratio'], marker='o', markersize=3)
 
-axs[1].plot(df_merged['redshift'], df_merged['mass_gas'], marker='o', color='purple')
+axs[0].set_ylabel('Massa Estelar\n[$10^{10} M_\\odot / h$]')
 axs[1].set_ylabel('Massa de Gás\n[$10^{10} M_\\odot / h$]')
-
-axs[2].plot(df_merged['redshift'], df_merged['gas_to_stars_ratio'], marker='o', color='black')
 axs[2].set_ylabel('Razão Massa Gás / Massa Estelar')
 axs[2].set_xlabel('Redshift (z)')
 axs[2].axhline(1, color='red', linestyle='--', label='Razão = 1')
 axs[2].legend()
+if len(keys) == 2:
+    axs[0].legend(fontsize='x-small', ncol=2)
 
 for ax in axs:
     ax.grid(True)
@@ -49,4 +56,3 @@ plt.savefig('mass_gas_stars_ratio_evolution_merged.png')
 plt.show()
 
 print('Gráfico salvo como mass_gas_stars_ratio_evolution_merged.png')
-
@@ -0,0 +1,122 @@
+"""Persistent on-disk cache for immutable TNG API responses.
+
+Simulation outputs never change, so subhalo, halo and snapshot documents
+can be stored locally after the first download. Entries live in a single
+SQLite file keyed by ``{api root}/simulation/snapshots/{snap}/{kind}/{id}``
+and the least recently used ones are evicted once the cache grows past
+``CACHE_MAX_BYTES``.
+
+Everything cached on disk (responses, snapshot tables, MPB files, group
+catalogs and cutouts) lives under ``CACHE_DIR``, a subdirectory named
+after the API root, so responses of a mock server (``TNG_API_ROOT``
+pointing at ``mock_tng_server.py``) never mix with real TNG data.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+# --- Cache Configuration ---
+# Read here rather than in tng_api (which imports this module) because the cache paths depend on it
+API_ROOT = os.environ.get('TNG_API_ROOT', 'https://www.tng-project.org/api').rstrip('/')
+CACHE_ROOT = os.environ.get('TNG_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'dark-jelly'))
+CACHE_MAX_BYTES = int(float(os.environ.get('TNG_CACHE_MAX_MB', 2048)) * 1024 ** 2)
+
+# API paths (relative to the API root) whose responses never change
+CACHEABLE_PATHS = (
+    re.compile(r'^[^/]+/snapshots/$'),
+    re.compile(r'^[^/]+/snapshots/\d+/$'),
+    re.compile(r'^[^/]+/snapshots/\d+/subhalos/\d+/$'),
+    re.compile(r'^[^/]+/snapshots/\d+/halos/\d+/info\.json$'),
+)
+
+
+def cache_namespace(api_root):
+    """Filesystem-safe name of an API root, e.g. ``www.tng-project.org_api``."""
+    parts = urlsplit(api_root)
+    return re.sub(r'[^A-Za-z0-9.-]+', '_', f'{parts.netloc}{parts.path}').strip('_') or 'local'
+
+
+# One cache per API root
+CACHE_DIR = os.path.join(CACHE_ROOT, cache_namespace(API_ROOT))
+
+
+def cache_key(api_root, url, params=None):
+    """Key for ``url`` if its response is immutable, otherwise None."""
+    if not url.startswith(api_root + '/'):
+        return None
+    path = url[len(api_root) + 1:]
+    if not any(p.match(path) for p in CACHEABLE_PATHS):
+        return None
+    if params:
+        path += '?' + urlencode(sorted(params.items()))
+    return f'{cache_namespace(api_root)}/{path}'
+
+
+class ResponseCache:
+    """Size-bounded LRU key/value store backed by SQLite."""
+
+    def __init__(self, path, max_bytes=CACHE_MAX_BYTES):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' key TEXT PRIMARY KEY, body BLOB NOT NULL,'
+            ' size INTEGER NOT NULL, last_access REAL NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)')
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute('SELECT body FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute('UPDATE responses SET last_access = ? WHERE key = ?', (time.time(), key))
+            return row[0]
+
+    def put(self, key, body):
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO responses (key, body, size, last_access) VALUES (?, ?, ?, ?)',
+                (key, body, len(body), time.time()),
+            )
+            self._evict()
+
+    def size(self):
+        with self._lock:
+            return self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._db.execute('DELETE FROM responses')
+
+    def _evict(self):
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute('SELECT key, size FROM responses ORDER BY last_access').fetchall()
+        stale = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._db.executemany('DELETE FROM responses WHERE key = ?', stale)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide cache stored under ``CACHE_DIR``."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(os.path.join(CACHE_DIR, 'responses.sqlite'))
+    return _cache
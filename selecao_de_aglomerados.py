@@ -1,7 +1,8 @@
-import pandas as pd
+import cluster_index
+import stage_store
 
 # Lê os dados
-df = pd.read_csv("gemeas_tng100_m200.csv")
+df = stage_store.load("gemeas_tng100_m200.csv", stage="m200")
 df_clean = df.dropna(subset=["M200c_10^10Msun/h"])
 masses = df_clean["M200c_10^10Msun/h"]
 
@@ -14,18 +15,13 @@ aglomerados = {
     "Subestrutura F0083": (3160, 670),
 }
 
-# Função para determinar quais aglomerados cada galáxia pertence
-def identificar_aglomerados(m):
-    tags = []
-    for nome, (centro, erro) in aglomerados.items():
-        if centro - erro <= m <= centro + erro:
-            tags.append(nome)
-    return ", ".join(tags) if tags else "Nenhum"
-
-# Aplica a função ao DataFrame
-df_clean["Aglomerados_Contidos"] = df_clean["M200c_10^10Msun/h"].apply(identificar_aglomerados)
+# Classifica todas as galáxias de uma vez: matriz de pertencimento (galáxia x aglomerado)
+# e os nomes de todos os aglomerados que contêm cada uma
+pertencimento, df_clean["Aglomerados_Contidos"] = cluster_index.classify(
+    df_clean["M200c_10^10Msun/h"], aglomerados, none_label="Nenhum")
+print(pertencimento.sum().to_string())
 
 # Salva CSV
-df_clean.to_csv("gemeas_tng100_m200_com_aglomerados.csv", index=False)
+stage_store.save(df_clean, "gemeas_tng100_m200_com_aglomerados.csv", "aglomerados")
 print(" Arquivo salvo: gemeas_tng100_m200_com_aglomerados.csv")
 
@@ -0,0 +1,82 @@
+"""Per-simulation snapshot metadata (redshift, scale factor, cosmic age).
+
+The table is built once from the API ``snapshots/`` listing, saved next to
+the response cache and memoized in-process, so looking up the redshift of
+a snapshot never costs an HTTP request after the first run.
+"""
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import requests
+
+import response_cache
+import tng_api
+
+# Planck 2015 cosmology used by IllustrisTNG
+OMEGA_M = 0.3089
+OMEGA_LAMBDA = 0.6911
+HUBBLE_PARAM = 0.6774
+HUBBLE_TIME_GYR = 9.7779 / HUBBLE_PARAM  # 1/H0
+
+
+def cosmic_age(scale_factor):
+    """Age of a flat LCDM universe in Gyr at the given scale factor."""
+    a = np.asarray(scale_factor, dtype=float)
+    return (2.0 / (3.0 * np.sqrt(OMEGA_LAMBDA)) * HUBBLE_TIME_GYR
+            * np.arcsinh(np.sqrt(OMEGA_LAMBDA / OMEGA_M) * a ** 1.5))
+
+
+# sim -> error of a failed table load; not retried for the rest of the run
+_failed_tables = {}
+
+
+def _table_path(sim):
+    return os.path.join(response_cache.CACHE_DIR, f'snapshots_{sim}.csv')
+
+
+@lru_cache(maxsize=None)
+def get_snapshot_table(sim=tng_api.DEFAULT_SIMULATION):
+    """DataFrame indexed by snapshot number with redshift, scale_factor and age_gyr."""
+    path = _table_path(sim)
+    if os.path.exists(path):
+        return pd.read_csv(path, index_col='snapshot')
+
+    listing = tng_api.get_json(f'{tng_api.base_url(sim)}/snapshots/')
+    table = pd.DataFrame({
+        'snapshot': [int(s['number']) for s in listing],
+        'redshift': [float(s['redshift']) for s in listing],
+    }).set_index('snapshot').sort_index()
+    table['scale_factor'] = 1.0 / (1.0 + table['redshift'])
+    table['age_gyr'] = cosmic_age(table['scale_factor'])
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table.to_csv(path)
+    return table
+
+
+def get_snapshot_redshift(snap, sim=tng_api.DEFAULT_SIMULATION):
+    """Redshift of ``snap``, or None if the table cannot be loaded.
+
+    A failed load is reported once and remembered, so a run without API
+    access does not request the listing again for every progenitor.
+    """
+    if sim in _failed_tables:
+        return None
+    try:
+        table = get_snapshot_table(sim)
+    except (requests.RequestException, ValueError, KeyError) as e:  # HTTP, bad JSON, unexpected listing
+        _failed_tables[sim] = e
+        print(f"Could not load snapshot table for {sim}: {e}")
+        return None
+    snap = int(snap)
+    return float(table.at[snap, 'redshift']) if snap in table.index else None
+
+
+def snapshot_to_redshift(sim=tng_api.DEFAULT_SIMULATION, snaps=None):
+    """``{snapshot: redshift}`` for ``snaps`` (all snapshots by default)."""
+    table = get_snapshot_table(sim)
+    if snaps is not None:
+        table = table.loc[list(snaps)]
+    return table['redshift'].to_dict()
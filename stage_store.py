@@ -0,0 +1,136 @@
+"""Typed columnar handoff files between the pipeline scripts.
+
+Every stage table is still written as the CSV the scripts have always
+exchanged, and, when pyarrow is installed, also as a Parquet file next to
+it (``gemeas_tng100_m200.csv`` -> ``gemeas_tng100_m200.parquet``) with the
+stage's column types. ``load`` reads the Parquet file (memory-mapped, only
+the requested columns) when it exists and is not older than the CSV; a
+CSV that was edited by hand afterwards wins. Without pyarrow the CSV is
+read with the schema's dtypes and only the requested columns, so nothing
+is re-inferred from text either way.
+"""
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow not installed: CSV only
+    pa = pq = None
+
+# Column types per stage; columns not listed keep the type pandas gives them
+SCHEMAS = {
+    # "filtro jelly repitidas.py" -> jellyfish_local*.csv (ScoreAdjusted keeps the HDF5 precision)
+    'jellyfish_local': {'SubfindID': 'int64', 'SnapNum': 'int32', 'JellyfishFlag': 'int32'},
+    # tng50.py / tng100.py -> jellyfish_gemeas_massas*.csv
+    'gemeas_massas': {'snapshot': 'int32', 'subhalo_id': 'int64', 'log10_stellar_mass': 'float64'},
+    # grupo.py -> jellyfish_com_halo.csv
+    'com_halo': {'snapshot': 'int32', 'subhalo_id': 'int64', 'log10_stellar_mass': 'float64',
+                 'GroupNumber': 'Int64'},
+    # gemeas_com_grupos*.csv, input of M200.py
+    'com_grupos': {'snapshot': 'int32', 'subhalo_id': 'int64', 'log10_stellar_mass': 'float64',
+                   'group_number': 'int64'},
+    # M200.py -> gemeas_tng*_m200.csv (histom200.py adds Aglomerado_Associado)
+    'm200': {'snapshot': 'int32', 'subhalo_id': 'int64', 'log10_stellar_mass': 'float64',
+             'group_number': 'int64', 'M200c_10^10Msun/h': 'float64', 'Aglomerado_Associado': 'string'},
+    # selecao_de_aglomerados.py -> gemeas_tng100_m200_com_aglomerados.csv
+    'aglomerados': {'snapshot': 'int32', 'subhalo_id': 'int64', 'log10_stellar_mass': 'float64',
+                    'group_number': 'int64', 'M200c_10^10Msun/h': 'float64', 'Aglomerados_Contidos': 'string'},
+}
+
+
+def parquet_path(csv_path):
+    return f'{os.path.splitext(csv_path)[0]}.parquet'
+
+
+def apply_schema(df, stage):
+    """``df`` with the stage's columns cast to their declared types."""
+    schema = SCHEMAS.get(stage, {})
+    return df.astype({col: dtype for col, dtype in schema.items() if col in df.columns})
+
+
+def _replace(write, path):
+    tmp_path = f'{path}.part'
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def save(df, csv_path, stage=None):
+    """Write a stage table as CSV and, with pyarrow, as typed Parquet. Returns the typed frame."""
+    df = apply_schema(df, stage)
+    _replace(lambda path: df.to_csv(path, index=False), csv_path)
+    if pq is not None:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        _replace(lambda path: pq.write_table(table, path), parquet_path(csv_path))
+    return df
+
+
+def has_parquet(csv_path):
+    """True if a Parquet copy at least as new as the CSV can be read."""
+    path = parquet_path(csv_path)
+    if pq is None or not os.path.exists(path):
+        return False
+    return not os.path.exists(csv_path) or os.path.getmtime(path) >= os.path.getmtime(csv_path)
+
+
+def load(csv_path, columns=None, stage=None):
+    """Stage table with only ``columns`` (all if None), typed by the stage schema."""
+    columns = list(columns) if columns is not None else None
+    if has_parquet(csv_path):
+        table = pq.read_table(parquet_path(csv_path), columns=columns, memory_map=True)
+        return apply_schema(table.to_pandas(), stage)
+
+    schema = SCHEMAS.get(stage, {})
+    wanted = set(columns) if columns is not None else None
+    # Nullable/string columns are cast after parsing; plain numeric ones are parsed directly
+    dtype = {col: t for col, t in schema.items() if t not in ('Int64', 'string') and (wanted is None or col in wanted)}
+    df = pd.read_csv(csv_path, usecols=columns, dtype=dtype)
+    if columns is not None:
+        df = df[columns]
+    return apply_schema(df, stage)
+
+
+class StageWriter:
+    """Append DataFrame blocks to a stage's CSV (and Parquet) without holding the whole table."""
+
+    def __init__(self, csv_path, columns, stage=None):
+        self.csv_path = csv_path
+        self.columns = list(columns)
+        self.stage = stage
+        self.rows = 0
+        self._csv = open(f'{csv_path}.part', 'w', newline='')
+        self._parquet = None
+
+    def write(self, frame):
+        frame = apply_schema(frame[self.columns], self.stage)
+        frame.to_csv(self._csv, header=self.rows == 0, index=False)
+        if pq is not None:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(f'{parquet_path(self.csv_path)}.part', table.schema)
+            self._parquet.write_table(table)
+        self.rows += len(frame)
+
+    def close(self):
+        if self.rows == 0:
+            # Header-only outputs, typed like the non-empty ones
+            empty = apply_schema(pd.DataFrame({col: pd.Series(dtype='float64') for col in self.columns}),
+                                 self.stage)
+            self.write(empty)
+        self._csv.close()
+        os.replace(f'{self.csv_path}.part', self.csv_path)
+        if self._parquet is not None:
+            self._parquet.close()
+            os.replace(f'{parquet_path(self.csv_path)}.part', parquet_path(self.csv_path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self._csv.close()
+            if self._parquet is not None:
+                self._parquet.close()
@@ -0,0 +1,90 @@
+"""Main-progenitor branches from the SubLink merger trees.
+
+Instead of following ``prog_snap``/``prog_sfid`` one request per snapshot,
+the whole main-progenitor branch (MPB) of a subhalo is downloaded in a
+single ``sublink/mpb.hdf5`` request, cached on disk and returned as
+columnar NumPy arrays in chronological order.
+"""
+import os
+
+import h5py
+import numpy as np
+import requests
+
+import response_cache
+import snapshots
+import tng_api
+
+MPB_DIR = os.path.join(response_cache.CACHE_DIR, 'sublink')
+
+# SubhaloMassType / SubhaloHalfmassRadType particle-type columns
+PARTTYPE_GAS, PARTTYPE_DM, PARTTYPE_STARS, PARTTYPE_BH = 0, 1, 4, 5
+
+# Raw SubLink datasets read from the MPB file
+TREE_FIELDS = (
+    'SnapNum', 'SubfindID', 'SubhaloGrNr', 'SubhaloMassType', 'SubhaloSFR',
+    'SubhaloStarMetallicity', 'SubhaloHalfmassRadType', 'SubhaloBHMass',
+)
+
+
+def mpb_path(snap, subhalo_id, sim=tng_api.DEFAULT_SIMULATION):
+    return os.path.join(MPB_DIR, sim, f'mpb_{int(snap):03d}_{int(subhalo_id)}.hdf5')
+
+
+def download_mpb(snap, subhalo_id, sim=tng_api.DEFAULT_SIMULATION):
+    """Local path of the MPB file, downloading it on first use."""
+    path = mpb_path(snap, subhalo_id, sim)
+    if not os.path.exists(path):
+        url = f'{tng_api.base_url(sim)}/snapshots/{int(snap)}/subhalos/{int(subhalo_id)}/sublink/mpb.hdf5'
+        tng_api.download(url, path)
+    return path
+
+
+def read_mpb(path):
+    """Parse an MPB file into chronological columns named like the API JSON fields."""
+    with h5py.File(path, 'r') as f:
+        raw = {key: f[key][:] for key in TREE_FIELDS if key in f}
+
+    # SubLink stores the branch from the root backwards; flip to increasing time
+    order = np.argsort(raw['SnapNum'])
+    raw = {key: values[order] for key, values in raw.items()}
+
+    mass_type = raw['SubhaloMassType']
+    radius_type = raw['SubhaloHalfmassRadType']
+    return {
+        'snap': raw['SnapNum'].astype(np.int32),
+        'subhalo_id': raw['SubfindID'].astype(np.int64),
+        'group_number': raw['SubhaloGrNr'].astype(np.int64),
+        'mass_gas': mass_type[:, PARTTYPE_GAS],
+        'mass_dm': mass_type[:, PARTTYPE_DM],
+        'mass_stars': mass_type[:, PARTTYPE_STARS],
+        'mass_bhs': mass_type[:, PARTTYPE_BH],
+        'bh_mass': raw['SubhaloBHMass'],
+        'sfr': raw['SubhaloSFR'],
+        'starmetallicity': raw['SubhaloStarMetallicity'],
+        'halfmassrad_stars': radius_type[:, PARTTYPE_STARS],
+    }
+
+
+def load_branch(path, sim=tng_api.DEFAULT_SIMULATION, min_snap=None):
+    """Read a downloaded MPB file, drop snapshots before ``min_snap`` and add redshifts."""
+    branch = read_mpb(path)
+    if min_snap is not None:
+        keep = branch['snap'] >= min_snap
+        branch = {key: values[keep] for key, values in branch.items()}
+
+    table = snapshots.get_snapshot_table(sim)
+    branch['redshift'] = table['redshift'].reindex(branch['snap']).to_numpy()
+    return branch
+
+
+def get_main_progenitor_branch(snap, subhalo_id, sim=tng_api.DEFAULT_SIMULATION, min_snap=None):
+    """Full MPB history of a subhalo with a ``redshift`` column, or None on failure.
+
+    Masses are in 10^10 M_sun/h and radii in ckpc/h, as in the API JSON.
+    """
+    try:
+        return load_branch(download_mpb(snap, subhalo_id, sim), sim, min_snap)
+    except (requests.RequestException, OSError, KeyError) as e:
+        print(f"Could not load MPB of subhalo {subhalo_id} (snapshot {snap}): {e}")
+        return None
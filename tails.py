@@ -1,18 +1,25 @@
 import requests
 import h5py
 import numpy as np
+import matplotlib
 import matplotlib.pyplot as plt
 from matplotlib.colors import LogNorm
 from matplotlib.patches import Circle
+from PIL import Image
 import os
-import io
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 
-# --- 1. CONFIGURATION ---
+import cutouts
+import density_maps
+import fast_png
+import journal
+import timelapse
+import tng_api
 
-API_KEY = ""
+# --- 1. CONFIGURATION ---
 
 SIMULATION = 'TNG100-1'
-BASE_URL = f'https://www.tng-project.org/api/{SIMULATION}/'
+BASE_URL = f'{tng_api.base_url(SIMULATION)}/'
 
 GALAXIES_TO_TRACK = [
     {"final_snap": 67, "id": 107813},
@@ -46,64 +53,289 @@ RESOLUTION_PIXELS = 400
 SFR_MIN = 1e-6
 SFR_MAX = 1e-1
 
-# --- 2. HELPER FUNCTIONS ---
+# 'histogram' puts each gas cell in one pixel; 'sph' spreads it over its smoothing length
+SFR_MAP_MODE = 'histogram'
+
+# Only the particle fields used by the maps are downloaded
+CUTOUT_FIELDS = {
+    'gas': ('Coordinates', 'StarFormationRate') + (('Masses', 'Density') if SFR_MAP_MODE == 'sph' else ()),
+    'stars': ('Coordinates', 'Masses'),
+}
+
+# Cutouts are kept on disk between runs; only fields not stored yet are downloaded.
+# The store (and its cache directory) is created on the first download, not on import
+_cutout_store = None
 
-def get_api_data(url):
-    headers = {"api-key": API_KEY}
-    r = requests.get(url, headers=headers)
-    r.raise_for_status()
-    return r.json()
+# Binning and rendering run in a process pool fed by the download stage
+RENDER_WORKERS = os.cpu_count() or 1
+MAX_PENDING_FRAMES = 2 * RENDER_WORKERS
+
+OUTPUT_DIR_MAIN = "galaxy_evolution_plots"
+
+# 'template' builds the figure once per worker and only updates the data per frame;
+# 'figure' rebuilds the whole figure for every snapshot;
+# 'fast' writes the map itself straight to PNG (contours, circle and scale bar, no text)
+RENDER_MODE = 'template'
+FIGURE_DPI = 150
+PNG_COMPRESS_LEVEL = 1  # template mode; fast zlib level, files are a little larger
+
+# 'frames' saves one PNG per snapshot; 'timelapse' streams each galaxy's history
+# into a single video or GIF (fast-mode frames, fixed SFR_MIN-SFR_MAX colour scale)
+OUTPUT_MODE = 'frames'
+TIMELAPSE_FORMAT = 'mp4'  # 'mp4' or 'webm' need ffmpeg; 'gif' uses Pillow
+TIMELAPSE_FPS = 6
+INTERPOLATE_GAPS = True  # fill snapshots skipped by the progenitor branch with blended frames
+
+# --- 2. HELPER FUNCTIONS ---
 
-def get_snapshot_data(snap_num, subhalo_id):
+def get_subhalo_details(snap_num, subhalo_id):
     subhalo_url = f"{BASE_URL}snapshots/{snap_num}/subhalos/{subhalo_id}/"
-    subhalo_details = get_api_data(subhalo_url)
+    return tng_api.get_json(subhalo_url)
 
-    cutout_url = subhalo_details['cutouts'].get('subhalo') or subhalo_details['cutouts']['parent_halo']
-    cutout_request = {'gas': 'all', 'stars': 'all'}
-    headers = {"api-key": API_KEY}
-
-    response = requests.get(cutout_url, headers=headers, params=cutout_request)
-    response.raise_for_status()
-
-    with h5py.File(io.BytesIO(response.content), "r") as f:
-        gas_data = {}
-        star_data = {}
-        if 'PartType0' in f:
-            gas_data = {key: f['PartType0'][key][:] for key in f['PartType0'].keys()}
-        if 'PartType4' in f:
-            star_data = {key: f['PartType4'][key][:] for key in f['PartType4'].keys()}
-        header = {key: val for key, val in f['Header'].attrs.items()}
+def get_cutout_store():
+    global _cutout_store
+    if _cutout_store is None:
+        _cutout_store = cutouts.CutoutStore()
+    return _cutout_store
 
-    return subhalo_details, gas_data, star_data, header
+def get_cutout_path(subhalo_details, snap_num, subhalo_id):
+    """Local path of the subhalo's stored cutout (downloaded if needed)."""
+    cutout_url = subhalo_details['cutouts'].get('subhalo') or subhalo_details['cutouts']['parent_halo']
+    return get_cutout_store().fetch(SIMULATION, snap_num, subhalo_id, cutout_url, CUTOUT_FIELDS)
 
 def get_surface_density_map(coords, weights, plot_range, pixels, center_pos, box_size):
-    dx = coords[:, 0] - center_pos[0]
-    dy = coords[:, 1] - center_pos[1]
-    dx[dx > box_size/2] -= box_size
-    dx[dx < -box_size/2] += box_size
-    dy[dy > box_size/2] -= box_size
-    dy[dy < -box_size/2] += box_size
-
-    pixel_area_kpc2 = (plot_range / pixels)**2
-
-    hist, _, _ = np.histogram2d(
-        dx, dy,
-        bins=pixels,
-        range=[[-plot_range/2, plot_range/2], [-plot_range/2, plot_range/2]],
-        weights=weights
-    )
-    return hist.T / pixel_area_kpc2
-
-# --- 3. MAIN PROCESSING LOOP ---
-
-output_dir_main = "galaxy_evolution_plots"
-os.makedirs(output_dir_main, exist_ok=True)
-
-for g in GALAXIES_TO_TRACK:
-    final_snap = g['final_snap']
-    final_id = g['id']
-    galaxy_output_dir = os.path.join(output_dir_main, f"galaxy_{final_id}_history")
-    os.makedirs(galaxy_output_dir, exist_ok=True)
+    return density_maps.surface_density_map(coords, weights, plot_range, pixels, center_pos, box_size)
+
+def get_sfr_map(gas_data, plot_range, pixels, center_pos, box_size):
+    sfr_values = gas_data['StarFormationRate'][:]
+    if SFR_MAP_MODE != 'sph':
+        return get_surface_density_map(gas_data['Coordinates'], sfr_values, plot_range, pixels, center_pos, box_size)
+
+    hsml = density_maps.smoothing_lengths(gas_data['Masses'][:], gas_data['Density'][:])
+    return density_maps.smoothed_surface_density_maps(
+        gas_data['Coordinates'], {'sfr': sfr_values}, hsml, plot_range, pixels, center_pos, box_size)['sfr']
+
+def get_progenitor(subhalo_cat):
+    """(snapshot, subhalo ID) of the SubLink progenitor, or None at the start of the branch."""
+    prog_url = subhalo_cat['related'].get('sublink_progenitor')
+    if not prog_url or prog_url.rstrip('/').endswith('/null'):
+        return None
+    parts = prog_url.rstrip('/').split('/')
+    return int(parts[-3]), int(parts[-1])
+
+def make_frame_job(subhalo_cat, cutout_path, snap, subhalo_id, galaxy_output_dir):
+    """Everything a render worker needs for one frame (small and picklable)."""
+    # Use correct position fields
+    if 'pos_x' in subhalo_cat and 'pos_y' in subhalo_cat and 'pos_z' in subhalo_cat:
+        subhalo_pos = np.array([subhalo_cat['pos_x'], subhalo_cat['pos_y'], subhalo_cat['pos_z']])
+    elif 'cm_x' in subhalo_cat and 'cm_y' in subhalo_cat and 'cm_z' in subhalo_cat:
+        subhalo_pos = np.array([subhalo_cat['cm_x'], subhalo_cat['cm_y'], subhalo_cat['cm_z']])
+    else:
+        raise KeyError("No position keys found in subhalo_cat")
+
+    return {
+        'cutout_path': cutout_path,
+        'snap': snap,
+        'subhalo_id': subhalo_id,
+        'subhalo_pos': subhalo_pos,
+        # Stellar mass log (use mass_log_msun if available)
+        'stellar_mass_log': subhalo_cat.get("mass_log_msun", 0.0),
+        # Twice the half mass radius of stars
+        'r_dist': 2 * subhalo_cat.get('halfmassrad_stars', 0.0),
+        'output_filename': os.path.join(galaxy_output_dir, f"snap_{snap:03d}_id_{subhalo_id}.png"),
+    }
+
+def compute_maps(job):
+    """SFR and stellar surface-density maps of a frame, read from the stored cutout."""
+    with h5py.File(job['cutout_path'], 'r') as f:
+        gas_data = cutouts.particle_group(f, 'gas')
+        star_data = cutouts.particle_group(f, 'stars')
+        header = {key: val for key, val in f['Header'].attrs.items()}
+        box_size = header['BoxSize']
+
+        if 'StarFormationRate' not in gas_data or len(gas_data['StarFormationRate']) == 0:
+            return header, None, None
+
+        sfr_map = get_sfr_map(gas_data, PLOT_SIZE_CKPC, RESOLUTION_PIXELS, job['subhalo_pos'], box_size)
+        sfr_map[sfr_map <= 0] = 1e-10
+
+        if 'Masses' not in star_data or len(star_data['Masses']) == 0:
+            print("    Warning: No star particles found.")
+            stellar_mass_map = np.zeros_like(sfr_map)
+        else:
+            star_masses = star_data['Masses'][:] * 1e10 / header['HubbleParam']
+            stellar_mass_map = get_surface_density_map(star_data['Coordinates'], star_masses, PLOT_SIZE_CKPC, RESOLUTION_PIXELS, job['subhalo_pos'], box_size)
+
+    return header, sfr_map, stellar_mass_map
+
+def plot_frame(job, redshift, sfr_map, stellar_mass_map):
+    peak_stellar_density = np.max(stellar_mass_map)
+    contour_levels = [
+        0.6 * peak_stellar_density,
+        0.7 * peak_stellar_density,
+        0.8 * peak_stellar_density
+    ] if peak_stellar_density > 0 else []
+
+    fig, ax = plt.subplots(figsize=(6, 6), facecolor='black')
+    ax.set_facecolor('black')
+
+    ax.imshow(sfr_map, origin='lower',
+              extent=[-PLOT_SIZE_CKPC/2, PLOT_SIZE_CKPC/2, -PLOT_SIZE_CKPC/2, PLOT_SIZE_CKPC/2],
+              cmap='inferno', norm=LogNorm(vmin=SFR_MIN, vmax=SFR_MAX))
+
+    if contour_levels:
+        ax.contour(stellar_mass_map, levels=contour_levels, colors='cyan', linewidths=0.5, alpha=0.6,
+                   extent=[-PLOT_SIZE_CKPC/2, PLOT_SIZE_CKPC/2, -PLOT_SIZE_CKPC/2, PLOT_SIZE_CKPC/2])
+
+    ax.add_patch(Circle((0, 0), job['r_dist'], edgecolor='turquoise', facecolor='none', linewidth=1.5, linestyle='--'))
+
+    ax.text(0.05, 0.95, f'{SIMULATION}\nlog M$_*$ = {job["stellar_mass_log"]:.1f}\nz = {redshift:.2f}, ID = {job["subhalo_id"]}',
+            transform=ax.transAxes, ha='left', va='top', color='white', fontsize=10)
+
+    ax.plot([-PLOT_SIZE_CKPC/2 + 5, -PLOT_SIZE_CKPC/2 + 15], [-PLOT_SIZE_CKPC/2 + 5, -PLOT_SIZE_CKPC/2 + 5],
+            color='white', linewidth=2)
+    ax.text(-PLOT_SIZE_CKPC/2 + 5, -PLOT_SIZE_CKPC/2 + 7, '10 ckpc', color='white', fontsize=9)
+
+    ax.set_xticks([])
+    ax.set_yticks([])
+    ax.set_xlim(-PLOT_SIZE_CKPC/2, PLOT_SIZE_CKPC/2)
+    ax.set_ylim(-PLOT_SIZE_CKPC/2, PLOT_SIZE_CKPC/2)
+
+    plt.tight_layout()
+    plt.savefig(job['output_filename'], dpi=FIGURE_DPI, facecolor='black')
+    plt.close(fig)
+
+class FrameTemplate:
+    """The ``plot_frame`` figure built once; each frame only swaps image, contours and text."""
+
+    def __init__(self):
+        half = PLOT_SIZE_CKPC / 2
+        self.extent = [-half, half, -half, half]
+        self.fig, self.ax = plt.subplots(figsize=(6, 6), facecolor='black', dpi=FIGURE_DPI)
+        ax = self.ax
+        ax.set_facecolor('black')
+
+        blank = np.full((RESOLUTION_PIXELS, RESOLUTION_PIXELS), SFR_MIN)
+        self.image = ax.imshow(blank, origin='lower', extent=self.extent,
+                               cmap='inferno', norm=LogNorm(vmin=SFR_MIN, vmax=SFR_MAX))
+        self.contours = None
+        self.circle = ax.add_patch(Circle((0, 0), 1, edgecolor='turquoise', facecolor='none', linewidth=1.5, linestyle='--'))
+        self.label = ax.text(0.05, 0.95, '', transform=ax.transAxes, ha='left', va='top', color='white', fontsize=10)
+
+        ax.plot([-half + 5, -half + 15], [-half + 5, -half + 5], color='white', linewidth=2)
+        ax.text(-half + 5, -half + 7, '10 ckpc', color='white', fontsize=9)
+
+        ax.set_xticks([])
+        ax.set_yticks([])
+        ax.set_xlim(-half, half)
+        ax.set_ylim(-half, half)
+        # Layout depends only on the fixed artists, so it is computed once
+        self.fig.tight_layout()
+
+    def render(self, job, redshift, sfr_map, stellar_mass_map):
+        """Draw one frame and return it as an RGBA array."""
+        self.image.set_data(sfr_map)
+
+        if self.contours is not None:
+            self.contours.remove()
+            self.contours = None
+        peak_stellar_density = np.max(stellar_mass_map)
+        if peak_stellar_density > 0:
+            levels = [0.6 * peak_stellar_density, 0.7 * peak_stellar_density, 0.8 * peak_stellar_density]
+            self.contours = self.ax.contour(stellar_mass_map, levels=levels, colors='cyan', linewidths=0.5,
+                                            alpha=0.6, extent=self.extent)
+
+        self.circle.set_radius(job['r_dist'])
+        self.label.set_text(f'{SIMULATION}\nlog M$_*$ = {job["stellar_mass_log"]:.1f}\nz = {redshift:.2f}, ID = {job["subhalo_id"]}')
+
+        self.fig.canvas.draw()
+        return np.asarray(self.fig.canvas.buffer_rgba())
+
+    def save(self, job, redshift, sfr_map, stellar_mass_map):
+        rgba = self.render(job, redshift, sfr_map, stellar_mass_map)
+        Image.fromarray(rgba).save(job['output_filename'], compress_level=PNG_COMPRESS_LEVEL)
+
+_frame_template = None
+
+def get_frame_template():
+    """Per-process figure template, created on first use in each worker."""
+    global _frame_template
+    if _frame_template is None:
+        _frame_template = FrameTemplate()
+    return _frame_template
+
+def render_fast_frame(sfr_map, stellar_mass_map, r_dist):
+    """Map-only RGB frame drawn by ``fast_png``, one image pixel per map pixel."""
+    peak_stellar_density = np.max(stellar_mass_map)
+    contour_levels = [0.6 * peak_stellar_density, 0.7 * peak_stellar_density,
+                      0.8 * peak_stellar_density] if peak_stellar_density > 0 else []
+    ckpc_to_pixels = RESOLUTION_PIXELS / PLOT_SIZE_CKPC
+    return fast_png.render_map(sfr_map, SFR_MIN, SFR_MAX,
+                               contour_field=stellar_mass_map, contour_levels=contour_levels,
+                               circle_radius=r_dist * ckpc_to_pixels,
+                               scale_bar=(5 * ckpc_to_pixels, 15 * ckpc_to_pixels, 5 * ckpc_to_pixels))
+
+def save_fast_frame(job, sfr_map, stellar_mass_map):
+    with open(job['output_filename'], 'wb') as f:
+        f.write(fast_png.encode_png(render_fast_frame(sfr_map, stellar_mass_map, job['r_dist'])))
+
+def render_frame(job):
+    """Worker entry point: bin the stored cutout and save the frame. Returns the PNG path or None."""
+    header, sfr_map, stellar_mass_map = compute_maps(job)
+    if sfr_map is None:
+        print(f"    Warning: No gas with SFR at snapshot {job['snap']}. Skipping plot.")
+        return None
+    if RENDER_MODE == 'template':
+        get_frame_template().save(job, header['Redshift'], sfr_map, stellar_mass_map)
+    elif RENDER_MODE == 'fast':
+        save_fast_frame(job, sfr_map, stellar_mass_map)
+    else:
+        plot_frame(job, header['Redshift'], sfr_map, stellar_mass_map)
+    return job['output_filename']
+
+def compute_timelapse_maps(job):
+    """Worker entry point for time-lapse output: ``(sfr_map, stellar_mass_map, r_dist)`` or None."""
+    header, sfr_map, stellar_mass_map = compute_maps(job)
+    if sfr_map is None:
+        print(f"    Warning: No gas with SFR at snapshot {job['snap']}. Skipping frame.")
+        return None
+    return sfr_map.astype(np.float32), stellar_mass_map.astype(np.float32), job['r_dist']
+
+def write_timelapse(galaxy_id, history):
+    """Encode ``{snap: maps}`` of one galaxy, oldest snapshot first, without writing any PNG."""
+    snaps = sorted(history)
+    path = os.path.join(OUTPUT_DIR_MAIN, f"galaxy_{galaxy_id}_history.{TIMELAPSE_FORMAT}")
+    with timelapse.TimelapseWriter(path, RESOLUTION_PIXELS, RESOLUTION_PIXELS, TIMELAPSE_FPS) as writer:
+        for i0, i1, t in timelapse.frame_schedule(snaps, INTERPOLATE_GAPS):
+            sfr0, stars0, r0 = history[snaps[i0]]
+            sfr1, stars1, r1 = history[snaps[i1]]
+            sfr_map = timelapse.log_blend(sfr0, sfr1, t, SFR_MIN)
+            stellar_mass_map = stars0 + t * (stars1 - stars0)
+            writer.write(render_fast_frame(sfr_map, stellar_mass_map, r0 + t * (r1 - r0)))
+    return path
+
+def init_render_worker():
+    matplotlib.use('Agg')
+
+# --- 3. PIPELINE ---
+
+def journal_path():
+    """Journal of finished units: (galaxy, snapshot) frames, or whole galaxies in timelapse mode."""
+    name = 'frames' if OUTPUT_MODE == 'frames' else f'timelapse_{TIMELAPSE_FORMAT}'
+    return os.path.join(OUTPUT_DIR_MAIN, f'journal_{name}.jsonl')
+
+def fetch_frames(galaxy, done=()):
+    """Download stage: walk one galaxy's progenitors and yield a render job per snapshot.
+
+    Snapshots whose (galaxy, snapshot) unit is in ``done`` are only walked
+    through, not downloaded again. A failed cutout download skips that
+    frame; the walk stops only when the subhalo itself cannot be fetched.
+    """
+    final_snap = galaxy['final_snap']
+    final_id = galaxy['id']
+    galaxy_output_dir = os.path.join(OUTPUT_DIR_MAIN, f"galaxy_{final_id}_history")
+    if OUTPUT_MODE == 'frames':
+        os.makedirs(galaxy_output_dir, exist_ok=True)
 
     print(f"\n--- Tracking Galaxy {final_id} from snap {final_snap} back to {START_SNAP} ---")
 
@@ -113,89 +345,7 @@ for g in GALAXIES_TO_TRACK:
     while current_snap >= START_SNAP and current_id != -1:
         print(f"  Processing Snapshot: {current_snap}, Subhalo ID: {current_id}")
         try:
-            subhalo_cat, gas_data, star_data, header = get_snapshot_data(current_snap, current_id)
-            redshift = header['Redshift']
-            box_size = header['BoxSize']
-
-            # Use correct position fields
-            if 'pos_x' in subhalo_cat and 'pos_y' in subhalo_cat and 'pos_z' in subhalo_cat:
-                subhalo_pos = np.array([subhalo_cat['pos_x'], subhalo_cat['pos_y'], subhalo_cat['pos_z']])
-            elif 'cm_x' in subhalo_cat and 'cm_y' in subhalo_cat and 'cm_z' in subhalo_cat:
-                subhalo_pos = np.array([subhalo_cat['cm_x'], subhalo_cat['cm_y'], subhalo_cat['cm_z']])
-            else:
-                raise KeyError("No position keys found in subhalo_cat")
-
-            # Stellar mass log (use mass_log_msun if available)
-            stellar_mass_log = subhalo_cat.get("mass_log_msun", 0.0)
-
-            # Half mass radius of stars
-            half_mass_rad_stars = subhalo_cat.get('halfmassrad_stars', 0.0)
-            r_dist = 2 * half_mass_rad_stars
-
-            if 'StarFormationRate' not in gas_data or len(gas_data['StarFormationRate']) == 0:
-                print("    Warning: No gas with SFR. Skipping plot.")
-                current_id = int(subhalo_cat['related']['sublink_progenitor'].split('/')[-2])
-                current_snap -= 1
-                continue
-
-            sfr_values = gas_data['StarFormationRate']
-            sfr_map = get_surface_density_map(gas_data['Coordinates'], sfr_values, PLOT_SIZE_CKPC, RESOLUTION_PIXELS, subhalo_pos, box_size)
-            sfr_map[sfr_map <= 0] = 1e-10
-
-            if 'Masses' not in star_data or len(star_data['Masses']) == 0:
-                print("    Warning: No star particles found.")
-                peak_stellar_density = 0
-                stellar_mass_map = np.zeros_like(sfr_map)
-            else:
-                star_masses = star_data['Masses'] * 1e10 / header['HubbleParam']
-                stellar_mass_map = get_surface_density_map(star_data['Coordinates'], star_masses, PLOT_SIZE_CKPC, RESOLUTION_PIXELS, subhalo_pos, box_size)
-                peak_stellar_density = np.max(stellar_mass_map)
-
-            contour_levels = [
-                0.6 * peak_stellar_density,
-                0.7 * peak_stellar_density,
-                0.8 * peak_stellar_density
-            ] if peak_stellar_density > 0 else []
-
-            fig, ax = plt.subplots(figsize=(6, 6), facecolor='black')
-            ax.set_facecolor('black')
-
-            ax.imshow(sfr_map, origin='lower',
-                      extent=[-PLOT_SIZE_CKPC/2, PLOT_SIZE_CKPC/2, -PLOT_SIZE_CKPC/2, PLOT_SIZE_CKPC/2],
-                      cmap='inferno', norm=LogNorm(vmin=SFR_MIN, vmax=SFR_MAX))
-
-            if contour_levels:
-                ax.contour(stellar_mass_map, levels=contour_levels, colors='cyan', linewidths=0.5, alpha=0.6,
-                           extent=[-PLOT_SIZE_CKPC/2, PLOT_SIZE_CKPC/2, -PLOT_SIZE_CKPC/2, PLOT_SIZE_CKPC/2])
-
-            ax.add_patch(Circle((0, 0), r_dist, edgecolor='turquoise', facecolor='none', linewidth=1.5, linestyle='--'))
-
-            ax.text(0.05, 0.95, f'TNG100-1\nlog M$_*$ = {stellar_mass_log:.1f}\nz = {redshift:.2f}, ID = {current_id}',
-                    transform=ax.transAxes, ha='left', va='top', color='white', fontsize=10)
-
-            ax.plot([-PLOT_SIZE_CKPC/2 + 5, -PLOT_SIZE_CKPC/2 + 15], [-PLOT_SIZE_CKPC/2 + 5, -PLOT_SIZE_CKPC/2 + 5],
-                    color='white', linewidth=2)
-            ax.text(-PLOT_SIZE_CKPC/2 + 5, -PLOT_SIZE_CKPC/2 + 7, '10 ckpc', color='white', fontsize=9)
-
-            ax.set_xticks([])
-            ax.set_yticks([])
-            ax.set_xlim(-PLOT_SIZE_CKPC/2, PLOT_SIZE_CKPC/2)
-            ax.set_ylim(-PLOT_SIZE_CKPC/2, PLOT_SIZE_CKPC/2)
-
-            plt.tight_layout()
-            output_filename = os.path.join(galaxy_output_dir, f"snap_{current_snap:03d}_id_{current_id}.png")
-            plt.savefig(output_filename, dpi=150, facecolor='black')
-            plt.close(fig)
-
-            print(f"    -> Saved plot to {output_filename}")
-
-            # Get progenitor ID for next iteration
-            prog_url = subhalo_cat['related']['sublink_progenitor']
-            if prog_url == "http://www.tng-project.org/api/null":
-                break
-            current_id = int(prog_url.rstrip('/').split('/')[-1])
-            current_snap -= 1
-
+            subhalo_cat = get_subhalo_details(current_snap, current_id)
         except requests.exceptions.HTTPError as e:
             print(f"    HTTP ERROR: Subhalo {current_id} at snapshot {current_snap}: {e}")
             break
@@ -203,9 +353,102 @@ for g in GALAXIES_TO_TRACK:
             print(f"    ERROR: {e}")
             break
 
-    print(f"--- Finished tracking for galaxy ID {final_id} ---")
-
-print("\nAll processing complete.")
-
-
-
+        if (final_id, current_snap) in done:
+            print("    Already done, skipping.")
+        else:
+            try:
+                cutout_path = get_cutout_path(subhalo_cat, current_snap, current_id)
+                job = make_frame_job(subhalo_cat, cutout_path, current_snap, current_id, galaxy_output_dir)
+                job['galaxy_id'] = final_id
+                yield job
+            except Exception as e:
+                print(f"    ERROR: Skipping snapshot {current_snap}, subhalo {current_id}: {e}")
+
+        # Get progenitor for next iteration
+        progenitor = get_progenitor(subhalo_cat)
+        if progenitor is None:
+            break
+        current_snap, current_id = progenitor
+
+    print(f"--- Finished fetching galaxy ID {final_id} ---")
+
+def run_pipeline(galaxies, workers=RENDER_WORKERS, max_pending=MAX_PENDING_FRAMES):
+    """Fetch cutouts in this process while a pool of workers bins and renders them.
+
+    At most ``max_pending`` frames wait in the pool, so downloads never
+    run far ahead of rendering. In 'timelapse' mode the workers return
+    maps instead of PNGs and each galaxy's video is encoded as soon as all
+    of its frames are back. Finished frames (or videos) are recorded in a
+    journal, so a rerun after an interruption skips them; the journal is
+    removed once the pass completes.
+    """
+    os.makedirs(OUTPUT_DIR_MAIN, exist_ok=True)
+    finished = journal.Journal(journal_path())
+    use_timelapse = OUTPUT_MODE == 'timelapse'
+    worker = compute_timelapse_maps if use_timelapse else render_frame
+    pending = {}
+    histories = {}  # galaxy id -> {snap: maps}, timelapse mode only
+    outstanding = {}  # galaxy id -> frames submitted but not collected
+    fetching = set()
+
+    def finish(galaxy_id):
+        if galaxy_id in fetching or outstanding[galaxy_id]:
+            return
+        del outstanding[galaxy_id]
+        history = histories.pop(galaxy_id)
+        if not use_timelapse:
+            return
+        if not history:
+            print(f"    Warning: No frames for galaxy {galaxy_id}. Skipping time-lapse.")
+            return
+        try:
+            print(f"    -> Saved time-lapse to {write_timelapse(galaxy_id, history)}")
+            finished.record(galaxy_id)
+        except Exception as e:
+            print(f"    ERROR writing time-lapse of galaxy {galaxy_id}: {e}")
+
+    def collect(return_when):
+        done, _ = wait(pending, return_when=return_when)
+        for future in done:
+            job = pending.pop(future)
+            outstanding[job['galaxy_id']] -= 1
+            try:
+                result = future.result()
+                if use_timelapse:
+                    if result is not None:
+                        histories[job['galaxy_id']][job['snap']] = result
+                else:
+                    if result:
+                        print(f"    -> Saved plot to {result}")
+                    # Frames without SFR gas are done too: a rerun would skip them again
+                    finished.record(job['galaxy_id'], job['snap'])
+            except Exception as e:
+                print(f"    ERROR rendering snapshot {job['snap']}, subhalo {job['subhalo_id']}: {e}")
+            finish(job['galaxy_id'])
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_render_worker) as pool:
+        for galaxy in galaxies:
+            galaxy_id = galaxy['id']
+            if use_timelapse and (galaxy_id,) in finished:
+                print(f"\n--- Galaxy {galaxy_id} time-lapse already written, skipping ---")
+                continue
+            fetching.add(galaxy_id)
+            outstanding[galaxy_id] = 0
+            histories[galaxy_id] = {}
+            for job in fetch_frames(galaxy, () if use_timelapse else finished):
+                while len(pending) >= max_pending:
+                    collect(FIRST_COMPLETED)
+                pending[pool.submit(worker, job)] = job
+                outstanding[galaxy_id] += 1
+            fetching.discard(galaxy_id)
+            finish(galaxy_id)
+        while pending:
+            collect(FIRST_COMPLETED)
+
+    # Only an interrupted pass resumes: a completed one leaves no journal, so the next
+    # run renders everything again with the current PLOT_SIZE_CKPC, SFR_MIN/MAX, RENDER_MODE...
+    finished.clear()
+
+if __name__ == "__main__":
+    run_pipeline(GALAXIES_TO_TRACK)
+    print("\nAll processing complete.")
@@ -1,32 +1,31 @@
-import requests
 import numpy as np
 import matplotlib.pyplot as plt
 import pandas as pd
-from time import sleep
-import csv
+
+import bulk_lookup
+import stage_store
+import tng_api
+import twin_matching
 
 # Parâmetros
 CSV_ARQUIVO = "jellyfish_local50.csv"  # Substitua pelo nome correto do seu CSV
 snapshot_range = range(67, 100)  # Snapshots 68 até 99
 
 # Função para obter a massa estelar via API
-BASE_URL = "http://www.tng-project.org/api/TNG50-1"
-HEADERS = {"api-key": ""}  
+SIMULATION = "TNG50-1"  
 
 def get_stellar_mass(snapshot, subhalo_id):
-    url = f"{BASE_URL}/snapshots/{snapshot}/subhalos/{subhalo_id}/"
+    url = f"{tng_api.base_url(SIMULATION)}/snapshots/{snapshot}/subhalos/{subhalo_id}/"
     try:
-        response = requests.get(url, headers=HEADERS, timeout=30)
-        response.raise_for_status()
-        data = response.json()
+        data = tng_api.get_json(url)
         mass_stars = data["mass_stars"] * 1e10  # M☉
         return np.log10(mass_stars)
     except Exception as e:
         print(f"Erro em snapshot {snapshot}, subhalo {subhalo_id}: {e}")
         return None
 
-# Lê a tabela CSV
-df = pd.read_csv(CSV_ARQUIVO)
+# Lê só as colunas usadas, já tipadas (Parquet se disponível)
+df = stage_store.load(CSV_ARQUIVO, ['SubfindID', 'SnapNum', 'JellyfishFlag'], 'jellyfish_local')
 
 # Filtra apenas snapshots entre 68 e 99 e que são jellyfish
 df_jelly = df[(df['SnapNum'] >= 67) & (df['SnapNum'] <= 99) & (df['JellyfishFlag'] == 1)]
@@ -46,28 +45,31 @@ jellyfish_ids = list(zip(snaps, ids))
 F0083_MASS = 10.25
 TOLERANCE = 0.07
 
-todas_massas = []
-gemeas = []
+# Galáxias de referência: uma linha por objeto observado, todas buscadas de uma vez
+REFERENCIAS = pd.DataFrame([{"name": "F0083", "log10_stellar_mass": F0083_MASS}])
+# Tolerância por propriedade; outras colunas do catálogo (SFR, M200c, redshift...) podem entrar aqui
+TOLERANCIAS = {"log10_stellar_mass": TOLERANCE}
 
 print(f"Processando {len(jellyfish_ids)} galáxias jellyfish...")
 
-for i, (snap, sub_id) in enumerate(jellyfish_ids):
-    log_mass = get_stellar_mass(snap, sub_id)
-    if log_mass is not None:
-        todas_massas.append(log_mass)
-        if (F0083_MASS - TOLERANCE) <= log_mass <= (F0083_MASS + TOLERANCE):
-            gemeas.append((snap, sub_id, log_mass))
-    sleep(0.2)  # evitar excesso de requisições
+# Busca em paralelo com limite de taxa; o checkpoint permite retomar uma execução interrompida
+massas = bulk_lookup.run(jellyfish_ids, get_stellar_mass, "massas_jellyfish_TNG50.csv", "log10_stellar_mass")
+
+# Catálogo na ordem das jellyfish, só com as massas obtidas
+catalogo = pd.DataFrame(jellyfish_ids, columns=["snapshot", "subhalo_id"]).astype("int64").merge(
+    pd.DataFrame([(*key, value) for key, value in massas.items()],
+                 columns=["snapshot", "subhalo_id", "log10_stellar_mass"]).astype(
+        {"snapshot": "int64", "subhalo_id": "int64", "log10_stellar_mass": "float64"}),  # também se vazio
+    on=["snapshot", "subhalo_id"], how="left").dropna(subset=["log10_stellar_mass"])
+todas_massas = catalogo["log10_stellar_mass"]
 
-    if (i+1) % 50 == 0 or (i+1) == len(jellyfish_ids):
-        print(f"{i+1}/{len(jellyfish_ids)} processadas")
+# Janela de tolerância por searchsorted sobre as massas ordenadas (KD-tree com várias propriedades)
+gemeas = twin_matching.find_twins(catalogo, REFERENCIAS, TOLERANCIAS)
+colunas = ["snapshot", "subhalo_id", "log10_stellar_mass"] + (["reference"] if len(REFERENCIAS) > 1 else [])
 
 # Salvar gêmeas se houver
-if gemeas:
-    with open("jellyfish_gemeas_massas.csv", "w", newline="") as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(["snapshot", "subhalo_id", "log10_stellar_mass"])
-        writer.writerows(gemeas)
+if len(gemeas):
+    stage_store.save(gemeas[colunas], "jellyfish_gemeas_massas.csv", "gemeas_massas")
     print(f"{len(gemeas)} galáxias gêmeas salvas em 'jellyfish_gemeas_massas.csv'")
 else:
     print("Nenhuma galáxia gêmea encontrada na faixa da massa da F0083.")
@@ -0,0 +1,151 @@
+"""Shared client for the IllustrisTNG web API.
+
+All scripts go through this module instead of calling ``requests.get``
+directly, so every request reuses one pooled keep-alive session, follows
+the same retry/backoff policy and counts against one concurrency limit.
+"""
+import json
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import response_cache
+
+# --- API Configuration ---
+API_ROOT = response_cache.API_ROOT  # TNG_API_ROOT, default https://www.tng-project.org/api
+API_KEY = os.environ.get('TNG_API_KEY', '')  # insert your valid token here or export TNG_API_KEY
+
+DEFAULT_SIMULATION = 'TNG100-1'
+SIMULATIONS = ('TNG50-1', 'TNG100-1')
+
+# With TNG_OFFLINE=1 only cached responses are served; any network access fails
+OFFLINE = os.environ.get('TNG_OFFLINE', '') not in ('', '0')
+USE_CACHE = os.environ.get('TNG_NO_CACHE', '') in ('', '0')
+
+# --- Connection policy ---
+MAX_CONCURRENT_REQUESTS = int(os.environ.get('TNG_MAX_CONCURRENT', 8))
+MAX_RETRIES = 5
+BACKOFF_FACTOR = 0.5          # sleeps 0.5, 1, 2, 4... seconds between attempts
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+TIMEOUT = 60                  # seconds, per connect/read
+
+# Sent only on JSON requests; HDF5 downloads (cutouts, MPB, group catalogs) carry just the api-key
+JSON_HEADERS = {'Accept': 'application/json'}
+
+_session = None
+_session_lock = threading.Lock()
+_request_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+
+
+class OfflineError(requests.ConnectionError):
+    """Raised when offline mode blocks a request that is not in the cache."""
+
+
+def base_url(sim=DEFAULT_SIMULATION):
+    """Base API URL of a simulation, e.g. ``.../api/TNG50-1``."""
+    return f'{API_ROOT}/{sim}'
+
+
+def get_session():
+    """Return the process-wide keep-alive session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=MAX_RETRIES,
+                backoff_factor=BACKOFF_FACTOR,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=('GET', 'HEAD'),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=len(SIMULATIONS),
+                pool_maxsize=MAX_CONCURRENT_REQUESTS,
+                max_retries=retry,
+            )
+            session = requests.Session()
+            session.headers.update({'api-key': API_KEY})
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+    return _session
+
+
+def get(url, params=None, stream=False, headers=None):
+    """GET ``url`` through the shared session and raise on HTTP errors.
+
+    At most ``MAX_CONCURRENT_REQUESTS`` calls are in flight at once. With
+    ``stream=True`` the slot is released once the headers arrive, so the
+    caller is responsible for consuming and closing the response.
+    """
+    if OFFLINE:
+        raise OfflineError(f"offline mode: {url} is not available locally")
+    with _request_slots:
+        response = get_session().get(url, params=params, stream=stream, headers=headers, timeout=TIMEOUT)
+    response.raise_for_status()
+    return response
+
+
+def get_json(url, params=None):
+    """Fetch JSON and raise on HTTP or decoding errors.
+
+    Immutable simulation documents are served from the response cache
+    when present and stored there after a successful download.
+    """
+    key = response_cache.cache_key(API_ROOT, url, params) if USE_CACHE else None
+    if key is not None:
+        body = response_cache.get_cache().get(key)
+        if body is not None:
+            return json.loads(body)
+
+    response = get(url, params=params, headers=JSON_HEADERS)
+    data = response.json()
+    if key is not None:
+        response_cache.get_cache().put(key, response.content)
+    return data
+
+
+def download(url, path, params=None, chunk_size=1 << 20):
+    """Stream ``url`` to ``path`` in chunks and return ``path``.
+
+    The body is written to a temporary file that is renamed into place
+    once complete, so an interrupted download never leaves a truncated
+    file behind.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f'{path}.part'
+    with get(url, params=params, stream=True) as response, open(tmp_path, 'wb') as f:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            f.write(chunk)
+    os.replace(tmp_path, path)
+    return path
+
+
+def fetch_json(url, params=None):
+    """Fetch JSON with error handling; returns None on failure."""
+    try:
+        return get_json(url, params=params)
+    except requests.RequestException as e:
+        print(f"Request failed: {e}")
+    except ValueError as e:
+        # The API answers some failures with an HTML page instead of JSON
+        print(f"Invalid JSON from {url}: {e}")
+    return None
+
+
+# --- Endpoint helpers ---
+
+def get_subhalo_data(snap, subhalo_id, sim=DEFAULT_SIMULATION):
+    return fetch_json(f'{base_url(sim)}/snapshots/{int(snap)}/subhalos/{int(subhalo_id)}/')
+
+
+def get_halo_info(snap, grnr, sim=DEFAULT_SIMULATION):
+    return fetch_json(f'{base_url(sim)}/snapshots/{int(snap)}/halos/{int(grnr)}/info.json')
+
+
+def get_snapshot_info(snap, sim=DEFAULT_SIMULATION):
+    return fetch_json(f'{base_url(sim)}/snapshots/{int(snap)}/')
@@ -0,0 +1,211 @@
+"""Single-pass evolution tracker shared by the mass/gas/DM/BH scripts.
+
+Every (snapshot, subhalo) along a galaxy's main progenitor branch is
+visited once and all properties are recorded into one long table with a
+row per galaxy and snapshot. ``mass_stars.py``, ``gas.py``, ``mass_dm.py``
+and ``bh_mass.py`` only select columns from it for plotting.
+"""
+import asyncio
+import importlib.util
+import os
+from functools import lru_cache
+
+import pandas as pd
+from tqdm import tqdm
+
+import journal
+import snapshots
+import sublink
+import tng_api
+
+# Galaxies are tracked concurrently by async_tracker when aiohttp is installed. async_tracker
+# imports this module, so it is only imported when used (see build_evolution_table)
+HAVE_AIOHTTP = importlib.util.find_spec('aiohttp') is not None
+
+# --- Galaxy list (final snapshot and subhalo ID at that snapshot) ---
+GALAXIES = [
+    {"final_snap": 67, "id": 107813},
+    {"final_snap": 67, "id": 74123},
+    {"final_snap": 72, "id": 96419},
+    {"final_snap": 72, "id": 70711},
+    {"final_snap": 84, "id": 132263},
+    {"final_snap": 99, "id": 108037},
+    {"final_snap": 99, "id": 125033},
+    {"final_snap": 99, "id": 143888},
+    {"final_snap": 91, "id": 124318},
+    {"final_snap": 91, "id": 139737},
+    {"final_snap": 99, "id": 158854},
+    {"final_snap": 91, "id": 141670},
+    {"final_snap": 84, "id": 130203},
+    {"final_snap": 84, "id": 140404},
+    {"final_snap": 78, "id": 124397},
+    {"final_snap": 91, "id": 168847},
+    {"final_snap": 84, "id": 144300},
+    {"final_snap": 78, "id": 148900},
+    {"final_snap": 99, "id": 227576},
+    {"final_snap": 99, "id": 235696},
+    {"final_snap": 99, "id": 281704},
+    {"final_snap": 99, "id": 314772}
+]
+
+# Properties recorded at every step, named as in the subhalo JSON
+EVOLUTION_FIELDS = (
+    'mass_stars', 'mass_gas', 'mass_dm', 'mass_bhs',
+    'sfr', 'starmetallicity', 'halfmassrad_stars',
+)
+TABLE_COLUMNS = ('galaxy_id', 'final_snap', 'snap', 'subhalo_id', 'redshift') + EVOLUTION_FIELDS
+
+OUTPUT_DIR = 'galaxy_evolution'
+
+
+def progenitor_row(snap, subhalo_id, data, sim=tng_api.DEFAULT_SIMULATION):
+    """Table row for one subhalo document of a progenitor walk."""
+    row = {'snap': snap, 'subhalo_id': subhalo_id,
+           'redshift': snapshots.get_snapshot_redshift(snap, sim)}
+    row.update({field: data.get(field) for field in EVOLUTION_FIELDS})
+    return row
+
+
+class Walk(list):
+    """Rows of a progenitor walk; ``complete`` is False if a request failed before the branch ended."""
+
+    def __init__(self, rows, complete):
+        super().__init__(rows)
+        self.complete = complete
+
+
+def walk_progenitors(subhalo_id, final_snap, sim=tng_api.DEFAULT_SIMULATION, min_snap=None):
+    """Follow prog_snap/prog_sfid one subhalo document at a time.
+
+    Fallback for when the SubLink MPB file is unavailable; each document
+    is fetched once and every field is read from it. Rows come out in
+    chronological order, as a ``Walk``.
+    """
+    rows = []
+    snap = final_snap
+    while snap != -1 and subhalo_id != -1 and (min_snap is None or snap >= min_snap):
+        data = tng_api.get_subhalo_data(snap, subhalo_id, sim)
+        if data is None:
+            return Walk(rows[::-1], complete=False)
+        rows.append(progenitor_row(snap, subhalo_id, data, sim))
+
+        snap = data.get('prog_snap', -1)
+        subhalo_id = data.get('prog_sfid', -1)
+    return Walk(rows[::-1], complete=True)
+
+
+def history_frame(subhalo_id, final_snap, branch=None, rows=()):
+    """Evolution table of one galaxy from an MPB ``branch`` or from walk ``rows``.
+
+    ``history.attrs['complete']`` is False when ``rows`` is a walk cut short
+    by a failed request; MPB branches are always complete.
+    """
+    if branch is not None:
+        history = pd.DataFrame({col: branch[col] for col in ('snap', 'subhalo_id', 'redshift') + EVOLUTION_FIELDS})
+    else:
+        history = pd.DataFrame(list(rows), columns=['snap', 'subhalo_id', 'redshift', *EVOLUTION_FIELDS])
+
+    history.insert(0, 'final_snap', final_snap)
+    history.insert(0, 'galaxy_id', subhalo_id)
+    history.attrs['complete'] = branch is not None or getattr(rows, 'complete', True)
+    return history
+
+
+def track_evolution(subhalo_id, final_snap, sim=tng_api.DEFAULT_SIMULATION, min_snap=None):
+    """Evolution table of one galaxy (one row per snapshot, all fields)."""
+    branch = sublink.get_main_progenitor_branch(final_snap, subhalo_id, sim, min_snap=min_snap)
+    if branch is not None:
+        return history_frame(subhalo_id, final_snap, branch=branch)
+    return history_frame(subhalo_id, final_snap, rows=walk_progenitors(subhalo_id, final_snap, sim, min_snap))
+
+
+def _event_loop_running():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def build_evolution_table(galaxies=GALAXIES, sim=tng_api.DEFAULT_SIMULATION, on_history=None):
+    """Track every galaxy once and concatenate their histories.
+
+    Galaxies are tracked concurrently by ``async_tracker`` when aiohttp is
+    installed, and one after another otherwise or when called from inside a
+    running event loop (e.g. Jupyter), where ``asyncio.run`` is not allowed.
+    ``on_history`` is called with each galaxy's table as soon as it is done.
+    """
+    if HAVE_AIOHTTP and not _event_loop_running():
+        import async_tracker
+        histories = async_tracker.track_galaxies(galaxies, sim, on_history=on_history)
+    else:
+        histories = []
+        for gal in tqdm(galaxies, desc="Tracking galaxies"):
+            histories.append(track_evolution(gal["id"], gal["final_snap"], sim))
+            if on_history is not None:
+                on_history(histories[-1])
+    return pd.concat(histories, ignore_index=True) if histories else pd.DataFrame(columns=TABLE_COLUMNS)
+
+
+def evolution_table_path(sim=tng_api.DEFAULT_SIMULATION):
+    return os.path.join(OUTPUT_DIR, f'evolution_{sim}.csv')
+
+
+@lru_cache(maxsize=None)
+def load_evolution_table(sim=tng_api.DEFAULT_SIMULATION):
+    """Evolution table of ``GALAXIES``, built and saved on first use.
+
+    While the table is being built every finished galaxy is appended to
+    ``<table>.part`` and recorded in a journal, so an interrupted build
+    resumes with the galaxies that are still missing. Only complete
+    histories (MPB file, or a walk that reached the start of the branch)
+    are recorded. Galaxies whose walk was cut short by a failed request are
+    left out and reported, ``galaxy_history`` tracks them again on demand,
+    and the final table is only written once a later run completes them.
+    """
+    path = evolution_table_path(sim)
+    if os.path.exists(path):
+        return pd.read_csv(path)
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    partial_path = f'{path}.part'
+    done = journal.Journal(f'{path}.journal')
+
+    def save(history):
+        if history.empty or not history.attrs.get('complete', True):
+            return
+        history.to_csv(partial_path, mode='a', header=not os.path.exists(partial_path), index=False)
+        done.record(history['galaxy_id'].iloc[0], history['final_snap'].iloc[0])
+
+    todo = [gal for gal in GALAXIES if (gal["id"], gal["final_snap"]) not in done]
+    if todo:
+        build_evolution_table(todo, sim, on_history=save)
+
+    table = pd.read_csv(partial_path) if os.path.exists(partial_path) else pd.DataFrame(columns=TABLE_COLUMNS)
+    # Rows appended just before a crash, without their journal entry, are dropped and redone
+    groups = {key: rows for key, rows in table.groupby(['galaxy_id', 'final_snap'], sort=False) if key in done}
+    parts = [groups[key].drop_duplicates('snap').sort_values('snap')
+             for key in ((gal["id"], gal["final_snap"]) for gal in GALAXIES) if key in groups]
+    table = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=TABLE_COLUMNS)
+
+    missing = [gal for gal in GALAXIES if (gal["id"], gal["final_snap"]) not in groups]
+    if missing:
+        print(f"Incomplete tracking, retried on the next run, for {len(missing)} galaxies: "
+              + ", ".join(f"{gal['id']} (snap {gal['final_snap']})" for gal in missing))
+
+    # Only a complete table is saved; otherwise the next run retries the missing galaxies
+    if not missing:
+        table.to_csv(path, index=False)
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        done.clear()
+    return table
+
+
+def galaxy_history(subhalo_id, final_snap, sim=tng_api.DEFAULT_SIMULATION):
+    """Rows of one galaxy, tracking it on demand if the table has none (not in ``GALAXIES``, or failed)."""
+    table = load_evolution_table(sim)
+    rows = table[(table['galaxy_id'] == subhalo_id) & (table['final_snap'] == final_snap)]
+    if rows.empty:
+        rows = track_evolution(subhalo_id, final_snap, sim)
+    return rows.sort_values('snap')
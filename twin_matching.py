@@ -0,0 +1,123 @@
+"""Vectorized search for catalog "twins" of one or many reference galaxies.
+
+A catalog row is a twin of a reference when every matched property lies
+within that property's tolerance of the reference value (``metric='box'``,
+the ``F0083_MASS ± TOLERANCE`` test of ``tng50.py``), or when the
+tolerance-scaled Euclidean distance is at most 1 (``metric='ellipse'``).
+
+A single property is matched by sorting the catalog once and finding each
+reference's window with ``np.searchsorted``. Several properties (e.g. M*,
+SFR, M200c, redshift) go through a KD-tree on tolerance-scaled values when
+scipy is installed; otherwise the window on the first property is found
+with ``searchsorted`` and the remaining properties are filtered inside it.
+Both paths apply the exact inequalities, so they return the same rows.
+"""
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # scipy not installed: sorted-window fallback
+    cKDTree = None
+
+METRICS = ('box', 'ellipse')
+
+
+def window_matches(values, centers, tolerance):
+    """``(reference, index)`` arrays of every ``values[index]`` within ``centers[reference] ± tolerance``.
+
+    ``tolerance`` may be a scalar or one value per center. NaN values never
+    match. Pairs are ordered by reference, then by index.
+    """
+    values = np.asarray(values, dtype=float)
+    centers = np.atleast_1d(np.asarray(centers, dtype=float))
+    tolerance = np.broadcast_to(np.asarray(tolerance, dtype=float), centers.shape)
+
+    valid = np.flatnonzero(~np.isnan(values))
+    order = valid[np.argsort(values[valid], kind='stable')]
+    sorted_values = values[order]
+    lo = np.searchsorted(sorted_values, centers - tolerance, side='left')
+    hi = np.searchsorted(sorted_values, centers + tolerance, side='right')
+    counts = np.maximum(hi - lo, 0)
+
+    reference = np.repeat(np.arange(len(centers)), counts)
+    # Position inside each window: a running count restarted at every reference
+    starts = np.repeat(lo - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+    index = order[starts + np.arange(counts.sum())]
+    # Restore catalog order within each reference
+    pairs = np.lexsort((index, reference))
+    return reference[pairs], index[pairs]
+
+
+def _within(catalog, references, tolerances, reference, index, metric):
+    """Exact tolerance test of candidate pairs; returns (mask, scaled distance)."""
+    offset = np.abs(catalog[index] - references[reference])
+    scaled = offset / tolerances
+    if metric == 'box':
+        return np.all(offset <= tolerances, axis=1), scaled.max(axis=1)
+    distance = np.sqrt(np.sum(scaled ** 2, axis=1))
+    return distance <= 1, distance
+
+
+def match_pairs(catalog, references, tolerances, metric='box'):
+    """``(reference, index, distance)`` of all twins; ``catalog`` is (N, d), ``references`` (M, d).
+
+    ``distance`` is the tolerance-scaled separation (max over properties for
+    'box', Euclidean for 'ellipse'); twins have distance <= 1.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"metric must be one of {METRICS}, not '{metric}'")
+    catalog = np.asarray(catalog, dtype=float)
+    # Explicit width: reshape(0, -1) is ambiguous for an empty catalog
+    width = catalog.shape[1] if catalog.ndim == 2 else 1
+    catalog = catalog.reshape(len(catalog), width)
+    references = np.asarray(references, dtype=float).reshape(len(references), width)
+    tolerances = np.broadcast_to(np.asarray(tolerances, dtype=float), (width,))
+    if not len(catalog) or not len(references):
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty, np.empty(0)
+
+    valid = np.flatnonzero(~np.isnan(catalog).any(axis=1))
+    if catalog.shape[1] == 1:
+        reference, index = window_matches(catalog[:, 0], references[:, 0], tolerances[0])
+        distance = np.abs(catalog[index, 0] - references[reference, 0]) / tolerances[0]
+        return reference, index, distance
+
+    if cKDTree is not None:
+        # Slightly larger radius, then the exact test below decides borderline points
+        tree = cKDTree(catalog[valid] / tolerances)
+        p = np.inf if metric == 'box' else 2
+        hits = tree.query_ball_point(references / tolerances, r=1 + 1e-9, p=p)
+        counts = np.fromiter((len(h) for h in hits), dtype=np.intp, count=len(hits))
+        reference = np.repeat(np.arange(len(references)), counts)
+        index = valid[np.concatenate([np.asarray(h, dtype=np.intp) for h in hits])] if counts.sum() \
+            else np.empty(0, dtype=np.intp)
+    else:
+        # Window on the first property; every twin lies inside it for both metrics
+        reference, index = window_matches(catalog[:, 0], references[:, 0], tolerances[0])
+        keep = ~np.isnan(catalog[index]).any(axis=1)
+        reference, index = reference[keep], index[keep]
+
+    inside, distance = _within(catalog, references, tolerances, reference, index, metric)
+    reference, index, distance = reference[inside], index[inside], distance[inside]
+    pairs = np.lexsort((index, reference))
+    return reference[pairs], index[pairs], distance[pairs]
+
+
+def find_twins(catalog, references, tolerances, metric='box', name_col='name'):
+    """Catalog rows matching each reference, with ``reference`` and ``twin_distance`` columns.
+
+    ``tolerances`` maps the properties to match to their tolerances, e.g.
+    ``{'log10_stellar_mass': 0.07, 'M200c_10^10Msun/h': 500}``; both frames
+    must have those columns. The reference is named by ``references[name_col]``
+    when present, by its index otherwise. Rows keep catalog order within
+    each reference.
+    """
+    columns = list(tolerances)
+    reference, index, distance = match_pairs(catalog[columns].to_numpy(dtype=float),
+                                             references[columns].to_numpy(dtype=float),
+                                             [tolerances[col] for col in columns], metric)
+    names = references[name_col].to_numpy() if name_col in references else references.index.to_numpy()
+    twins = catalog.iloc[index].reset_index(drop=True)
+    twins['reference'] = names[reference]
+    twins['twin_distance'] = distance
+    return twins